@@ -0,0 +1,547 @@
+"""
+Parallel Parameter-Sweep Auto-Tuner for the Upper Body Tracking System
+
+Description:
+This host tool replaces picking the tracking parameters by reflashing and
+watching. It evaluates candidate parameter sets on recorded frame sessions and
+reports the Pareto front of per-frame cost against tracking quality.
+
+Each session is replayed through the real tracker.py and controller.py code:
+- Detection runs the OpenCV upper body cascade (hostDetector.py) with the
+  candidate's threshold and scale_factor. The threshold becomes OpenCV
+  minNeighbors, so thresholds mapping to the same value are one detector
+  setting and only one such candidate is evaluated. Detection results and
+  timings are cached on disk and shared between all candidates with the same
+  detector setting, so the expensive step runs once per setting and session.
+- Cost per frame is the detection time plus the servo command time (I2C
+  writes and settle delays) the controller would spend on the camera. The
+  cascade runs much faster on a PC than on the camera, so the host detection
+  time is scaled by a device factor (DEVICE_FACTOR, --device-factor) to put
+  both in camera milliseconds. Both parts are reported separately as well.
+- Quality per frame is the IoU of the tracked box with the labelled box (1.0
+  when both agree that nobody is there). Sessions without labels are scored
+  against a slow, thorough reference detector setting instead.
+
+Detection and candidate evaluation are spread over a process pool on all cores.
+Detection times measured while every core is busy are noisy, so the detector
+settings on the Pareto front are timed again one at a time before the front is
+final.
+
+When the chosen threshold shares its minNeighbors with other thresholds of the
+search space, the host cannot tell them apart and threshold is left out of the
+tuned parameters (main.py keeps its default).
+
+Host Requirements:
+- Python 3 with numpy and opencv-python (for hostDetector.py)
+
+Input:
+- Session directories of grayscale frames (*.pgm, *.png, *.jpg, *.bmp) sorted
+  by name, with an optional labels.csv of "frame,x,y,w,h" rows (frame index,
+  frames without a row contain nobody)
+- Optional search space JSON: {"name": [values...]} for a grid, or
+  {"name": {"min": a, "max": b}} ranges for random search
+
+Output:
+- Pareto front table on the console
+- tuned_config.json, loaded by main.py on the camera
+
+Functions:
+- grid_candidates() / random_candidates(): Build the candidate list
+- unique_candidates(): Drop candidates with the same host detector setting
+- detect_session(): Run (or load cached) detection for one setting and session
+- time_session(): Time detection for one setting and session without the pool
+- evaluate(): Replay all sessions for one candidate
+- pareto_front(): Non-dominated candidates (lower cost, higher quality)
+- main(): Command line entry point
+
+Usage:
+    python autoTuner.py sessions/walk1 sessions/walk2
+    python autoTuner.py --space space.json --random 200 sessions/*
+"""
+
+import argparse
+import glob
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+
+import cv2
+
+import hostDetector
+import kernels
+import tracker
+import controller
+
+# ============================================================================
+# TUNER PARAMETERS
+# ============================================================================
+# Tunable parameters; the first two are detector settings
+DETECTOR_PARAMETERS = ("threshold", "scale_factor")
+PARAMETERS = DETECTOR_PARAMETERS + ("small_error", "large_error", "max_lost_frames",
+                                    "smoothing_alpha")
+
+# Default grid around the values in main.py, tracker.py and controller.py
+DEFAULT_SPACE = {
+    "threshold": [0.6, 0.7, 0.8],
+    "scale_factor": [1.1, 1.2, 1.35],
+    "small_error": [10, 15, 20],
+    "large_error": [30, 40, 60],
+    "max_lost_frames": [2, 3, 5],
+    "smoothing_alpha": [0.5, 0.7, 0.9],
+}
+
+# Slow, thorough detector setting used as reference when a session has no labels
+REFERENCE_DETECTOR = (0.75, 1.05)
+
+# Camera timing used in the replay
+FRAME_MS = 50          # Frame period at 20 FPS
+IDLE_TIMEOUT_MS = 500  # Idle motor timeout, as in main.py
+SERVO_WRITE_MS = 4     # One set_servo_pulse(): four register writes, 1ms apart
+
+# Camera detection time per host detection time. The OpenMV H7 runs the Haar
+# cascade about 10x slower than a desktop CPU; measure it for your PC by timing
+# upperbody_detector.detect() on the camera and hostDetector.py on the same frames
+DEVICE_FACTOR = 10.0
+
+# Files
+FRAME_PATTERNS = ("*.pgm", "*.png", "*.jpg", "*.bmp")
+LABELS_FILE = "labels.csv"
+CACHE_DIR = ".tuner_cache"
+OUTPUT_FILE = "tuned_config.json"
+
+# ============================================================================
+# SEARCH SPACE
+# ============================================================================
+def grid_candidates(space):
+    """
+    Input: space (dict) - Parameter name -> list of values
+    Output: list - Every combination as a parameter dict
+    """
+    for name in PARAMETERS:
+        if isinstance(space[name], dict):
+            raise ValueError("%s: {\"min\", \"max\"} ranges need --random, "
+                             "use a list of values for a grid" % name)
+    values = [space[name] for name in PARAMETERS]
+    return [dict(zip(PARAMETERS, combo)) for combo in itertools.product(*values)]
+
+def random_candidates(space, count, seed):
+    """
+    Input:
+        space (dict) - Parameter name -> list of values or {"min", "max"} range
+        count (int) - Number of candidates
+        seed (int) - Random seed
+    Output: list - Randomly sampled parameter dicts
+    """
+    rng = random.Random(seed)
+    candidates = []
+    for i in range(count):
+        candidate = {}
+        for name in PARAMETERS:
+            choice = space[name]
+            if isinstance(choice, dict):
+                low, high = choice["min"], choice["max"]
+                if isinstance(low, int) and isinstance(high, int):
+                    candidate[name] = rng.randint(low, high)
+                else:
+                    candidate[name] = round(rng.uniform(low, high), 3)
+            else:
+                candidate[name] = rng.choice(choice)
+        candidates.append(candidate)
+    return candidates
+
+def is_valid(candidate):
+    """
+    Input: candidate (dict) - Parameter set
+    Output: Boolean - False for combinations the controller cannot use
+    """
+    return (candidate["small_error"] < candidate["large_error"]
+            and 0 < candidate["smoothing_alpha"] <= 1
+            and candidate["scale_factor"] > 1)
+
+def detector_setting(candidate):
+    """
+    Input: candidate (dict) - Parameter set
+    Output: tuple - (min_neighbors, scale_factor) the host detector runs with
+    """
+    return (hostDetector.min_neighbors(candidate["threshold"]), candidate["scale_factor"])
+
+def unique_candidates(candidates):
+    """
+    Input: candidates (list) - Parameter sets
+    Output: list - First candidate of every distinct host behaviour; thresholds
+                   mapping to the same minNeighbors would only differ by noise
+    """
+    seen = set()
+    unique = []
+    for candidate in candidates:
+        key = detector_setting(candidate) + tuple(candidate[name] for name in PARAMETERS[2:])
+        if key not in seen:
+            seen.add(key)
+            unique.append(candidate)
+    return unique
+
+def device_params(candidate, thresholds):
+    """
+    Input:
+        candidate (dict) - Parameter set
+        thresholds (dict) - min_neighbors -> thresholds of the search space
+    Output: dict - Parameters for main.py, without threshold when the host
+                   detector could not tell it apart from other thresholds
+    """
+    params = dict(candidate)
+    if len(thresholds[hostDetector.min_neighbors(candidate["threshold"])]) > 1:
+        del params["threshold"]
+    return params
+
+# ============================================================================
+# SESSIONS AND DETECTION CACHE
+# ============================================================================
+def list_frames(session):
+    """
+    Input: session (str) - Session directory
+    Output: list - Frame file paths in recording order
+    """
+    frames = []
+    for pattern in FRAME_PATTERNS:
+        frames.extend(glob.glob(os.path.join(session, pattern)))
+    return sorted(frames)
+
+def load_labels(session, frame_count):
+    """
+    Input:
+        session (str) - Session directory
+        frame_count (int) - Number of frames in the session
+    Output: list or None - Labelled box or None per frame, None without labels.csv
+    """
+    path = os.path.join(session, LABELS_FILE)
+    if not os.path.exists(path):
+        return None
+
+    labels = [None] * frame_count
+    with open(path) as f:
+        for line in f:
+            fields = line.strip().split(",")
+            if len(fields) != 5 or not fields[0].isdigit():
+                continue  # Header or blank line
+            index = int(fields[0])
+            if index < frame_count:
+                labels[index] = tuple(int(v) for v in fields[1:])
+    return labels
+
+def cache_path(session, min_neighbors, scale_factor):
+    """
+    Input: session (str), min_neighbors (int), scale_factor (float)
+    Output: str - Cache file for this session and detector setting
+    """
+    frames = list_frames(session)
+    newest = max([os.path.getmtime(path) for path in frames] or [0])
+    key = "%s|%d|%.6f|%r|%r" % (os.path.abspath(session), len(frames), newest,
+                                min_neighbors, scale_factor)
+    return os.path.join(CACHE_DIR, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+def save_result(path, result):
+    """
+    Input: path (str) - Cache file, result (dict) - Detection result
+    Output: None (written atomically, workers may race on the same file)
+    """
+    tmp_path = path + ".%d.tmp" % os.getpid()
+    with open(tmp_path, "w") as f:
+        json.dump(result, f)
+    os.replace(tmp_path, path)
+
+def detect_session(task):
+    """
+    Run the cascade over one session, or load the cached result
+
+    Input: task (tuple) - (session, threshold, scale_factor)
+    Output: tuple - ((session, min_neighbors, scale_factor), result) with result
+                    {"boxes", "ms", "size", "serial"}; "serial" is True once the
+                    times were measured by time_session()
+    """
+    session, threshold, scale_factor = task
+    key = (session, hostDetector.min_neighbors(threshold), scale_factor)
+    path = cache_path(*key)
+    if os.path.exists(path):
+        with open(path) as f:
+            return key, json.load(f)
+
+    proposer = hostDetector.HostHaarProposer(threshold, scale_factor)
+    result = {"boxes": [], "ms": [], "size": [0, 0], "serial": False}
+    for frame_path in list_frames(session):
+        frame = cv2.imread(frame_path, cv2.IMREAD_GRAYSCALE)
+        start = time.perf_counter()
+        boxes = proposer.detect(frame)
+        result["ms"].append((time.perf_counter() - start) * 1000.0)
+        result["boxes"].append([list(box) for box in boxes])
+        result["size"] = [frame.shape[1], frame.shape[0]]
+
+    save_result(path, result)
+    return key, result
+
+def time_session(session, threshold, scale_factor, result):
+    """
+    Measure detection times again with nothing else running on the cores
+
+    Input:
+        session (str) - Session directory
+        threshold (float), scale_factor (float) - Detector setting
+        result (dict) - Detection result, its "ms" are replaced
+    Output: None (also updates the cache file)
+    """
+    proposer = hostDetector.HostHaarProposer(threshold, scale_factor)
+    result["ms"] = []
+    for frame_path in list_frames(session):
+        frame = cv2.imread(frame_path, cv2.IMREAD_GRAYSCALE)
+        start = time.perf_counter()
+        proposer.detect(frame)
+        result["ms"].append((time.perf_counter() - start) * 1000.0)
+    result["serial"] = True
+    save_result(cache_path(session, hostDetector.min_neighbors(threshold), scale_factor), result)
+
+# ============================================================================
+# CANDIDATE EVALUATION
+# ============================================================================
+class ReplayCost:
+    """
+    Stands in for the PCA9685 and time.sleep_ms, adding up the time the
+    controller would spend on servo commands instead of sending them
+    """
+
+    def __init__(self):
+        self.ms = 0.0
+
+    def set_servo_pulse(self, channel, pulse_us):
+        self.ms += SERVO_WRITE_MS
+        return True
+
+    def sleep_ms(self, ms):
+        self.ms += ms
+
+# Shared with the pool workers by init_worker()
+_detections = {}
+_labels = {}
+_device_factor = DEVICE_FACTOR
+
+def init_worker(detections, labels, device_factor):
+    """
+    Input:
+        detections (dict) - (session, min_neighbors, scale_factor) -> detection result
+        labels (dict) - session -> labelled box or None per frame
+        device_factor (float) - Camera detection time per host detection time
+    Output: None
+    """
+    global _detections, _labels, _device_factor
+    _detections = detections
+    _labels = labels
+    _device_factor = device_factor
+
+def frame_quality(tracked, label):
+    """
+    Input: tracked (tuple or None), label (tuple or None)
+    Output: float - 1.0 for agreement on nobody, IoU otherwise
+    """
+    if tracked is None or label is None:
+        return 1.0 if tracked is None and label is None else 0.0
+    return kernels.calculate_iou(tracked, label) / float(kernels.FIXED_ONE)
+
+def evaluate(candidate):
+    """
+    Replay every session with one candidate parameter set
+
+    Input: candidate (dict) - Parameter set
+    Output: tuple - (candidate, cost in camera ms per frame, quality 0-1,
+                     detection ms per frame, servo ms per frame)
+    """
+    total_detect = 0.0
+    total_servo = 0.0
+    total_quality = 0.0
+    total_frames = 0
+
+    for session, labels in _labels.items():
+        result = _detections[(session,) + detector_setting(candidate)]
+        width, height = result["size"]
+
+        cost = ReplayCost()
+        target_tracker = tracker.Tracker(max_lost_frames=candidate["max_lost_frames"],
+                                         alpha=candidate["smoothing_alpha"])
+        servo_controller = controller.ServoController(
+            cost, width // 2, height // 2,
+            small_error=candidate["small_error"], large_error=candidate["large_error"],
+            sleep_ms=cost.sleep_ms)
+
+        # Same per-frame flow as the main loop in main.py with OCCUPANCY_SLEW
+        # off: the frames were captured with the camera's own movements, so a
+        # slew to another direction cannot be replayed from them
+        for index, boxes in enumerate(result["boxes"]):
+            current_time = index * FRAME_MS
+            total_detect += result["ms"][index] * _device_factor
+            tracked_object = target_tracker.update([tuple(box) for box in boxes], current_time)
+
+            if target_tracker.target_lost:
+                servo_controller.force_stop()
+
+            if tracked_object:
+                servo_controller.track(tracked_object)
+            else:
+                if not target_tracker.last_tracked_pos:
+                    time_since_detection = current_time - target_tracker.last_detection_time
+                    if time_since_detection > IDLE_TIMEOUT_MS and servo_controller.motor_moving:
+                        servo_controller.force_stop()
+                servo_controller.idle()
+
+            total_quality += frame_quality(tracked_object, labels[index])
+
+        total_servo += cost.ms
+        total_frames += len(result["boxes"])
+
+    frames = max(1, total_frames)
+    return (candidate, (total_detect + total_servo) / frames, total_quality / frames,
+            total_detect / frames, total_servo / frames)
+
+def pareto_front(results):
+    """
+    Input: results (list) - (candidate, cost, quality, ...) tuples from evaluate()
+    Output: list - Non-dominated results sorted by cost
+    """
+    front = []
+    best_quality = -1.0
+    # Sorted by cost, then best quality first: a result is on the front if it
+    # beats the quality of every cheaper result
+    for result in sorted(results, key=lambda r: (r[1], -r[2])):
+        if result[2] > best_quality:
+            front.append(result)
+            best_quality = result[2]
+    return front
+
+# ============================================================================
+# COMMAND LINE ENTRY POINT
+# ============================================================================
+def main():
+    """
+    Input: Command line arguments
+    Output: None (prints the Pareto front and writes the config file)
+    """
+    parser = argparse.ArgumentParser(description="Tune tracking parameters on recorded sessions")
+    parser.add_argument("sessions", nargs="+", help="Session directories")
+    parser.add_argument("--space", default=None, help="Search space JSON file")
+    parser.add_argument("--random", type=int, default=0,
+                        help="Number of random candidates (default: full grid)")
+    parser.add_argument("--seed", type=int, default=1, help="Random search seed")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--max-cost", type=float, default=None,
+                        help="Pick the best quality within this cost per frame (camera ms)")
+    parser.add_argument("--device-factor", type=float, default=DEVICE_FACTOR,
+                        help="Camera detection time per host detection time")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Config file to write")
+    args = parser.parse_args()
+
+    space = dict(DEFAULT_SPACE)
+    if args.space:
+        with open(args.space) as f:
+            space.update(json.load(f))
+
+    if args.random:
+        candidates = random_candidates(space, args.random, args.seed)
+    else:
+        try:
+            candidates = grid_candidates(space)
+        except ValueError as e:
+            parser.error(str(e))
+    candidates = [c for c in candidates if is_valid(c)]
+
+    # Thresholds of the search space per host detector setting
+    thresholds = {}
+    for candidate in candidates:
+        thresholds.setdefault(hostDetector.min_neighbors(candidate["threshold"]),
+                              set()).add(candidate["threshold"])
+    candidates = unique_candidates(candidates)
+    print("Candidates:", len(candidates), "Sessions:", len(args.sessions))
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with multiprocessing.Pool(args.jobs) as pool:
+        # Stage 1: one detection run per detector setting and session
+        settings = {}
+        for candidate in candidates:
+            settings.setdefault(detector_setting(candidate),
+                                (candidate["threshold"], candidate["scale_factor"]))
+        tasks = [(s,) + settings[key] for s in args.sessions for key in sorted(settings)]
+
+        labels = {}
+        for session in args.sessions:
+            labels[session] = load_labels(session, len(list_frames(session)))
+            if labels[session] is None:
+                print("No", LABELS_FILE, "in", session, "- scoring against the reference detector")
+                tasks.append((session,) + REFERENCE_DETECTOR)
+
+        detections = dict(pool.map(detect_session, tasks))
+
+    # Unlabelled sessions use the largest reference detection as the label
+    reference_key = (hostDetector.min_neighbors(REFERENCE_DETECTOR[0]), REFERENCE_DETECTOR[1])
+    for session in args.sessions:
+        if labels[session] is None:
+            reference = detections[(session,) + reference_key]["boxes"]
+            labels[session] = [tuple(max(boxes, key=lambda r: r[2] * r[3])) if boxes else None
+                               for boxes in reference]
+
+    # Stage 2: replay every candidate on the cached detections
+    with multiprocessing.Pool(args.jobs, initializer=init_worker,
+                              initargs=(detections, labels, args.device_factor)) as pool:
+        results = pool.map(evaluate, candidates, chunksize=max(1, len(candidates) // (4 * args.jobs)))
+
+    # Stage 3: detection times from the pool include contention for the cores.
+    # Time the detector settings on the front again one at a time and replay
+    # their candidates, until every setting on the front has serial timings.
+    init_worker(detections, labels, args.device_factor)
+    while True:
+        front = pareto_front(results)
+        untimed = set(detector_setting(r[0]) for r in front
+                      if not all(detections[(s,) + detector_setting(r[0])].get("serial")
+                                 for s in args.sessions))
+        if not untimed:
+            break
+        for key in sorted(untimed):
+            print("Timing detector setting minNeighbors=%d scale_factor=%r" % key)
+            for session in args.sessions:
+                time_session(session, settings[key][0], settings[key][1],
+                             detections[(session,) + key])
+        results = [evaluate(r[0]) if detector_setting(r[0]) in untimed else r for r in results]
+
+    print("Camera ms per frame, detection = host time x %.1f" % args.device_factor)
+    print("%10s %10s %10s %8s  %s" % ("cost ms", "detect ms", "servo ms", "quality", "parameters"))
+    for candidate, cost, quality, detect_ms, servo_ms in front:
+        print("%10.2f %10.2f %10.2f %8.3f  %s" % (cost, detect_ms, servo_ms, quality,
+                                                  json.dumps(candidate, sort_keys=True)))
+
+    # Best quality on the front, optionally within the cost budget
+    eligible = [r for r in front if args.max_cost is None or r[1] <= args.max_cost] or front[:1]
+    chosen = max(eligible, key=lambda r: (r[2], -r[1]))
+
+    params = device_params(chosen[0], thresholds)
+    if "threshold" not in params:
+        print("Thresholds %s all run the host detector with minNeighbors=%d; "
+              "threshold is not tuned" % (sorted(thresholds[detector_setting(chosen[0])[0]]),
+                                          detector_setting(chosen[0])[0]))
+
+    config = {
+        "params": params,
+        "cost_ms": round(chosen[1], 3),
+        "detect_ms": round(chosen[3], 3),
+        "servo_ms": round(chosen[4], 3),
+        "quality": round(chosen[2], 4),
+        "device_factor": args.device_factor,
+        "pareto": [{"params": device_params(c, thresholds), "cost_ms": round(cost, 3),
+                    "detect_ms": round(detect_ms, 3), "servo_ms": round(servo_ms, 3),
+                    "quality": round(q, 4)}
+                   for c, cost, q, detect_ms, servo_ms in front],
+    }
+    with open(args.output, "w") as f:
+        json.dump(config, f, indent=2, sort_keys=True)
+    print("Selected", json.dumps(params, sort_keys=True), "->", args.output)
+
+
+if __name__ == "__main__":
+    main()
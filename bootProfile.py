@@ -0,0 +1,123 @@
+"""
+Module Load-Time and Free-Heap Comparison for the Upper Body Tracking System
+
+Description:
+This script runs on the OpenMV camera and imports the device modules from each
+available form in turn: source (.py), precompiled (.mpy) and frozen into the
+firmware. For every module it reports the import time and the heap the module
+keeps after loading, so the cost of compiling from source on boot can be
+compared with the precompiled and frozen forms.
+
+Copy build/src and build/mpy from buildMpy.py to the camera as /src and /mpy
+before running. The frozen column only appears with firmware built using
+buildMpy.py --firmware-dir.
+
+Input:
+- Device modules in SOURCE_DIR, MPY_DIR and the frozen module directory
+
+Output:
+- Serial console table of load time (ms) and heap used (bytes) per module
+
+Functions:
+- profile_form(): Import every module from one directory and measure it
+- run_profile(): Compare all available forms and print the table
+"""
+
+import gc
+import sys
+import time
+
+# ============================================================================
+# PROFILE PARAMETERS
+# ============================================================================
+# Device modules in dependency order, as in buildMpy.py
+DEVICE_MODULES = ("kernels", "driver", "detector", "tracker", "controller", "exposure",
+                  "preview", "occupancy", "recorder")
+
+# Module forms: (label, directory searched for the modules)
+FORMS = (
+    ("source", "/src"),
+    ("mpy", "/mpy"),
+    ("frozen", ".frozen"),
+)
+
+# ============================================================================
+# PROFILING
+# ============================================================================
+def unload_modules():
+    """
+    Input: None
+    Output: None (removes the device modules from sys.modules)
+    """
+    for name in DEVICE_MODULES:
+        if name in sys.modules:
+            del sys.modules[name]
+    gc.collect()
+
+def profile_form(path):
+    """
+    Import every device module from one directory only
+
+    Input: path (str) - Directory searched for the modules
+    Output: list or None - (load time in us, heap used in bytes) per module,
+            None if the modules are not available in this form
+    """
+    saved_path = list(sys.path)
+    sys.path[:] = [path]
+    results = []
+    try:
+        for name in DEVICE_MODULES:
+            gc.collect()
+            free_before = gc.mem_free()
+            start = time.ticks_us()
+            __import__(name)
+            elapsed = time.ticks_diff(time.ticks_us(), start)
+            gc.collect()
+            results.append((elapsed, free_before - gc.mem_free()))
+    except ImportError:
+        results = None
+    finally:
+        sys.path[:] = saved_path
+        unload_modules()
+    return results
+
+def run_profile():
+    """
+    Profile every available module form and print the comparison
+
+    Input: None
+    Output: None (prints results table)
+    """
+    unload_modules()
+    print("Free heap at start:", gc.mem_free(), "bytes")
+
+    columns = []
+    for label, path in FORMS:
+        results = profile_form(path)
+        if results is None:
+            print("Skipping", label, "form: modules not found in", path)
+        else:
+            columns.append((label, results))
+
+    header = "%-12s" % "Module"
+    for label, results in columns:
+        header += " %10s %10s" % (label + " ms", label + " B")
+    print(header)
+
+    totals = [[0, 0] for column in columns]
+    for i in range(len(DEVICE_MODULES)):
+        row = "%-12s" % DEVICE_MODULES[i]
+        for j in range(len(columns)):
+            elapsed, heap = columns[j][1][i]
+            totals[j][0] += elapsed
+            totals[j][1] += heap
+            row += " %10.2f %10d" % (elapsed / 1000, heap)
+        print(row)
+
+    row = "%-12s" % "Total"
+    for elapsed, heap in totals:
+        row += " %10.2f %10d" % (elapsed / 1000, heap)
+    print(row)
+
+
+run_profile()
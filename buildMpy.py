@@ -0,0 +1,198 @@
+"""
+Precompiled (.mpy) and Frozen Module Build for the Upper Body Tracking System
+
+Description:
+This host script compiles the device modules with mpy-cross so the camera
+loads bytecode directly instead of compiling the source on every boot. It can
+also write a frozen module manifest and build OpenMV firmware with the modules
+frozen into flash, where they load without using any heap for bytecode.
+
+main.py is always deployed as source because the firmware runs it by name; it
+only wires the modules together.
+
+Host Requirements:
+- Linux with Python 3
+- mpy-cross matching the camera firmware's MicroPython version
+  (pip install "mpy-cross==1.22.*", see MICROPYTHON_VERSION)
+- OpenMV firmware source tree and ARM toolchain (frozen build only)
+
+Input:
+- Device module sources (DEVICE_MODULES)
+
+Output:
+- build/src/: Source copies, for load-time comparison with bootProfile.py
+- build/mpy/: Precompiled .mpy modules
+- build/manifest.py: Frozen module manifest
+- Firmware image with frozen modules (with --firmware-dir)
+
+Functions:
+- check_mpy_cross(): Check that mpy-cross matches the firmware version
+- compile_modules(): Run mpy-cross on every device module
+- write_manifest(): Write the frozen module manifest
+- board_manifest_path(): Default board manifest of a firmware target
+- build_firmware(): Build OpenMV firmware with the frozen modules
+- main(): Command line entry point
+
+Usage:
+    python buildMpy.py
+    python buildMpy.py --firmware-dir ~/openmv/src --target OPENMV4P
+    python buildMpy.py --firmware-dir ~/openmv/src --board-manifest boards/manifest.py
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+
+# ============================================================================
+# BUILD PARAMETERS
+# ============================================================================
+# Device modules in dependency order
+DEVICE_MODULES = ("kernels", "driver", "detector", "tracker", "controller", "exposure",
+                  "preview", "occupancy", "recorder")
+
+# OpenMV H7 / H7 Plus: Cortex-M7 with double-precision FPU, needed for viper code
+DEFAULT_ARCH = "armv7emdp"
+DEFAULT_TARGET = "OPENMV4P"
+
+# MicroPython version of the camera firmware (sys.version in the OpenMV IDE
+# serial terminal). The camera only loads .mpy files from a matching mpy-cross.
+MICROPYTHON_VERSION = "1.22"
+BUILD_DIR = "build"
+
+# ============================================================================
+# BUILD STEPS
+# ============================================================================
+def check_mpy_cross(mpy_cross, micropython_version):
+    """
+    Make sure mpy-cross emits .mpy files the camera firmware can load
+
+    Input:
+        mpy_cross (str) - mpy-cross executable
+        micropython_version (str) - Firmware MicroPython version, e.g. "1.22"
+    Output: None (exits with a message on a version mismatch)
+    """
+    output = subprocess.run([mpy_cross, "--version"], check=True, capture_output=True,
+                            text=True).stdout.strip()
+    print(output)
+    match = re.search(r"MicroPython v(\d+\.\d+)", output)
+    if not match or match.group(1) != micropython_version:
+        raise SystemExit("mpy-cross is %s, the firmware runs MicroPython %s; install a matching "
+                         "mpy-cross (pip install \"mpy-cross==%s.*\") or pass --micropython-version"
+                         % (match.group(1) if match else "unknown", micropython_version,
+                            micropython_version))
+
+def compile_modules(mpy_cross, arch, build_dir):
+    """
+    Copy the sources and precompile them with mpy-cross
+
+    Input:
+        mpy_cross (str) - mpy-cross executable
+        arch (str) - Native code architecture passed to -march
+        build_dir (str) - Output directory
+    Output: None (prints source and .mpy sizes)
+    """
+    src_dir = os.path.join(build_dir, "src")
+    mpy_dir = os.path.join(build_dir, "mpy")
+    for path in (src_dir, mpy_dir):
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+    for name in DEVICE_MODULES:
+        source = name + ".py"
+        target = os.path.join(mpy_dir, name + ".mpy")
+        shutil.copy(source, src_dir)
+        subprocess.run([mpy_cross, "-march=" + arch, "-s", source, "-o", target, source], check=True)
+        print("%-14s %7d bytes source  %7d bytes mpy" %
+              (name, os.path.getsize(source), os.path.getsize(target)))
+
+def write_manifest(build_dir, board_manifest=None):
+    """
+    Write a MicroPython manifest freezing the device modules
+
+    Input:
+        build_dir (str) - Output directory, holding the src/ copies
+        board_manifest (str) - Board manifest to include, keeps its frozen modules
+    Output: str - Absolute path of the manifest
+    """
+    src_dir = os.path.abspath(os.path.join(build_dir, "src"))
+    path = os.path.abspath(os.path.join(build_dir, "manifest.py"))
+    with open(path, "w") as f:
+        f.write("# Generated by buildMpy.py\n")
+        if board_manifest:
+            f.write("include(%r)\n" % os.path.abspath(board_manifest))
+        for name in DEVICE_MODULES:
+            f.write("module(%r, base_path=%r)\n" % (name + ".py", src_dir))
+    print("Frozen module manifest:", path)
+    return path
+
+def board_manifest_path(firmware_dir, target):
+    """
+    Input:
+        firmware_dir (str) - OpenMV firmware source directory (openmv/src)
+        target (str) - OpenMV board target, e.g. OPENMV4P
+    Output: str - Path of the target's own frozen module manifest
+    """
+    return os.path.join(firmware_dir, "omv", "boards", target, "manifest.py")
+
+def build_firmware(firmware_dir, target, manifest):
+    """
+    Build OpenMV firmware with the device modules frozen into flash
+
+    Input:
+        firmware_dir (str) - OpenMV firmware source directory (openmv/src)
+        target (str) - OpenMV board target, e.g. OPENMV4P for the H7 Plus
+        manifest (str) - Frozen module manifest path
+    Output: None
+    """
+    subprocess.run(["make", "-C", firmware_dir, "-j%d" % (os.cpu_count() or 1),
+                    "TARGET=" + target, "FROZEN_MANIFEST=" + manifest], check=True)
+
+# ============================================================================
+# COMMAND LINE ENTRY POINT
+# ============================================================================
+def main():
+    """
+    Input: Command line arguments
+    Output: None
+    """
+    parser = argparse.ArgumentParser(description="Precompile and freeze the tracking modules")
+    parser.add_argument("--mpy-cross", default="mpy-cross", help="mpy-cross executable")
+    parser.add_argument("--march", default=DEFAULT_ARCH, help="Native code architecture")
+    parser.add_argument("--micropython-version", default=MICROPYTHON_VERSION,
+                        help="MicroPython version of the camera firmware")
+    parser.add_argument("--build-dir", default=BUILD_DIR, help="Output directory")
+    parser.add_argument("--board-manifest", default=None,
+                        help="Board manifest to include in the frozen manifest "
+                             "(default with --firmware-dir: the target's board manifest)")
+    parser.add_argument("--firmware-dir", default=None,
+                        help="OpenMV firmware source directory; builds firmware with frozen modules")
+    parser.add_argument("--target", default=DEFAULT_TARGET, help="OpenMV firmware target")
+    args = parser.parse_args()
+
+    # The firmware must keep the board's own frozen modules, so a firmware
+    # build always includes a board manifest
+    if args.firmware_dir and not args.board_manifest:
+        args.board_manifest = board_manifest_path(args.firmware_dir, args.target)
+        if not os.path.isfile(args.board_manifest):
+            parser.error("board manifest %s not found, pass --board-manifest" % args.board_manifest)
+
+    # Resolve user paths before changing to the script directory
+    if args.firmware_dir:
+        args.firmware_dir = os.path.abspath(args.firmware_dir)
+    if args.board_manifest:
+        args.board_manifest = os.path.abspath(args.board_manifest)
+
+    # Sources are looked up next to this script
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    check_mpy_cross(args.mpy_cross, args.micropython_version)
+    compile_modules(args.mpy_cross, args.march, args.build_dir)
+    manifest = write_manifest(args.build_dir, args.board_manifest)
+    if args.firmware_dir:
+        build_firmware(args.firmware_dir, args.target, manifest)
+
+
+if __name__ == "__main__":
+    main()
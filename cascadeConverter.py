@@ -19,7 +19,8 @@ Input:
 - Haar cascade file: "haarcascade_fullbody.cascade"
 
 Output:
-- Real-time detection display on camera
+- Real-time detection display on camera (RUN_MODE "ide"), a decimated JPEG
+  preview (RUN_MODE "preview") or no display at all (RUN_MODE "headless")
 - Visual bounding boxes around detected bodies
 - Tracking line from image center to largest body center
 - LED status indication (on when body detected, off when no detection)
@@ -35,6 +36,15 @@ import image
 import time
 import pyb
 import sensor
+import preview
+
+# ============================================================================
+# RUN MODE
+# ============================================================================
+# "ide": draw every frame, "headless": no drawing or frame buffer transfer,
+# "preview": draw and send a JPEG frame every preview.PREVIEW_INTERVAL frames
+RUN_MODE = "ide"
+debug_preview = preview.DebugPreview(RUN_MODE)
 
 # ============================================================================
 # HARDWARE INITIALIZATION
@@ -103,6 +113,9 @@ while(True):
     largest_face_size = 0      # Size of largest detected object
     largest_face_bb = None     # Bounding box of largest object
 
+    # Annotate only the frames that are displayed (never when headless)
+    draw_frame = debug_preview.begin_frame()
+
     # Process all detected objects
     for r in objects:
         # Calculate object size (area of bounding box)
@@ -115,7 +128,8 @@ while(True):
 
         # Draw bounding rectangle around all detected objects
         # r format: (x, y, width, height)
-        img.draw_rectangle(r)
+        if draw_frame:
+            img.draw_rectangle(r)
 
     # ========================================================================
     # TRACKING AND VISUAL FEEDBACK
@@ -147,7 +161,8 @@ while(True):
         # ====================================================================
         # Draw tracking line from image center to detected body center
         # This helps visualize the offset between camera center and target
-        img.draw_line(CENTER_X, CENTER_Y, face_x, face_y)
+        if draw_frame:
+            img.draw_line(CENTER_X, CENTER_Y, face_x, face_y)
 
     else:
         # ====================================================================
@@ -156,6 +171,9 @@ while(True):
         # Turn off status LED when no body is detected
         led.off()
 
+    # Send the annotated frame if this is a preview frame
+    debug_preview.end_frame(img)
+
     # ========================================================================
     # PERFORMANCE MONITORING OUTPUT
     # ========================================================================
@@ -0,0 +1,220 @@
+"""
+Pan/Tilt Servo Controller for the Upper Body Tracking System
+
+Description:
+This module turns the tracked bounding box into servo commands. The offset of
+the box centre from the image centre selects a stop, slow or fast pulse for each
+axis, and a pulse is only sent to the PCA9685 when it changes. It also handles
+stopping the motors when no target is tracked.
+
+Hardware Requirements:
+- PCA9685 PWM Driver Board (see driver.py)
+- 2x FS90R continuous rotation servos (horizontal and vertical)
+
+Input:
+- Tracked bounding box (x, y, width, height)
+- PCA9685 driver object
+
+Output:
+- Servo pulse commands for pan/tilt movement
+
+Functions:
+- ServoController.center(): Set both servos to neutral position at startup
+- ServoController.command(): Send a pulse and remember it per axis
+- ServoController.track(): Drive the servos towards the tracked box
+- ServoController.move(): Drive the servos to reduce a pixel error
+- ServoController.idle(): Stop the motors when no target is tracked
+- ServoController.force_stop(): Emergency stop for all servo motors
+"""
+
+import time
+import kernels
+
+# ============================================================================
+# SERVO CONTROL PARAMETERS
+# ============================================================================
+# Servo pulse width values in microseconds
+STOP_PULSE = 1520      # Neutral position (no movement)
+FORWARD_PULSE = 1530   # Fast forward movement
+REVERSE_PULSE = 1455   # Fast reverse movement
+SLOW_FORWARD = 1525    # Slow forward movement
+SLOW_REVERSE = 1475    # Slow reverse movement
+
+# Servo channel assignments on PCA9685
+H_CHANNEL = 0  # Horizontal servo channel
+V_CHANNEL = 1  # Vertical servo channel
+
+# Pulse tables for kernels.select_pulse()
+# (stop, positive error slow, positive error fast, negative error slow, negative error fast)
+# Horizontal: target to the left (positive error) moves camera right (forward)
+H_PULSES = (STOP_PULSE, SLOW_FORWARD, FORWARD_PULSE, SLOW_REVERSE, REVERSE_PULSE)
+# Vertical: target above (positive error) moves camera up (reverse)
+V_PULSES = (STOP_PULSE, SLOW_REVERSE, REVERSE_PULSE, SLOW_FORWARD, FORWARD_PULSE)
+
+# Error thresholds for servo movement decisions
+SMALL_ERROR = 15   # Minimum error to trigger slow movement
+LARGE_ERROR = 40   # Error threshold for fast movement
+
+# Stop management
+FORCE_STOP_FRAMES = 5  # Frames to ensure complete motor stop
+
+# ============================================================================
+# SERVO CONTROLLER
+# ============================================================================
+class ServoController:
+    """
+    Pan/tilt controller driving two continuous rotation servos
+
+    Input:
+        pwm (driver.PCA9685) - PWM driver for the servos
+        center_x (int) - Image centre X coordinate
+        center_y (int) - Image centre Y coordinate
+        small_error (int) - Minimum error to trigger slow movement
+        large_error (int) - Error threshold for fast movement
+        sleep_ms (function) - Delay function, defaults to time.sleep_ms; replaced
+                              when replaying sessions on a PC to count the delays
+    """
+
+    def __init__(self, pwm, center_x, center_y, small_error=SMALL_ERROR, large_error=LARGE_ERROR,
+                 sleep_ms=None):
+        self.pwm = pwm
+        self.center_x = center_x
+        self.center_y = center_y
+        self.small_error = small_error
+        self.large_error = large_error
+        self.sleep_ms = sleep_ms or time.sleep_ms
+
+        # Motor status variables
+        self.last_h_pulse = STOP_PULSE  # Last horizontal servo pulse value
+        self.last_v_pulse = STOP_PULSE  # Last vertical servo pulse value
+        self.motor_moving = False       # Flag indicating if motors are currently moving
+        self.force_stop_counter = 0
+
+        # Pulses currently on the wire, used to integrate the camera heading
+        self.h_command = STOP_PULSE
+        self.v_command = STOP_PULSE
+
+    def command(self, channel, pulse_us):
+        """
+        Send a servo pulse and remember it as the current command of its axis
+
+        Input:
+            channel (int) - H_CHANNEL or V_CHANNEL
+            pulse_us (int) - Pulse width in microseconds
+        Output: Boolean - True if successful, False if failed
+        """
+        if channel == H_CHANNEL:
+            self.h_command = pulse_us
+        else:
+            self.v_command = pulse_us
+        return self.pwm.set_servo_pulse(channel, pulse_us)
+
+    def center(self):
+        """
+        Set both servos to neutral position at startup
+
+        Input: None
+        Output: None
+        """
+        self.command(H_CHANNEL, STOP_PULSE)
+        time.sleep_ms(100)
+        self.command(V_CHANNEL, STOP_PULSE)
+        time.sleep(1)
+
+    def force_stop(self):
+        """
+        Emergency stop function for all servo motors
+        Sends multiple stop commands to ensure motors halt
+
+        Input: None
+        Output: None (resets motor state)
+        """
+        # Send multiple stop commands for reliability
+        for i in range(3):
+            self.command(H_CHANNEL, STOP_PULSE)
+            self.sleep_ms(10)
+            self.command(V_CHANNEL, STOP_PULSE)
+            self.sleep_ms(10)
+
+        # Reset motor state variables
+        self.last_h_pulse = STOP_PULSE
+        self.last_v_pulse = STOP_PULSE
+        self.motor_moving = False
+        self.force_stop_counter = 0
+
+    def track(self, tracked_object):
+        """
+        Drive the servos to bring the tracked box to the image centre
+
+        Input: tracked_object (tuple) - Tracked bounding box (x, y, width, height)
+        Output: None
+        """
+        # Calculate tracking errors (distance from image center)
+        x_error, y_error = kernels.calculate_error(tracked_object, self.center_x, self.center_y)
+        self.move(x_error, y_error)
+
+    def move(self, x_error, y_error):
+        """
+        Drive the servos to reduce an error measured in image pixels
+
+        Input:
+            x_error (int) - Horizontal error, positive when the target is left
+            y_error (int) - Vertical error, positive when the target is above
+        Output: Boolean - True if the servos are moving, False if within SMALL_ERROR
+        """
+        # Determine if movement is needed
+        should_move = abs(x_error) > self.small_error or abs(y_error) > self.small_error
+
+        if not should_move:
+            # Target is centered, stop motors
+            if self.motor_moving:
+                self.force_stop()
+            return False
+
+        self.motor_moving = True
+        self.force_stop_counter = 0
+
+        try:
+            # Horizontal: target to the left moves camera right, to the right moves it left
+            h_pulse = kernels.select_pulse(x_error, self.small_error, self.large_error, H_PULSES)
+
+            # Only send command if pulse value changed
+            if h_pulse != self.last_h_pulse:
+                self.last_h_pulse = h_pulse
+                self.command(H_CHANNEL, h_pulse)
+                self.sleep_ms(20)
+
+            # Vertical: target above moves camera up, below moves it down
+            v_pulse = kernels.select_pulse(y_error, self.small_error, self.large_error, V_PULSES)
+
+            # Only send command if pulse value changed
+            if v_pulse != self.last_v_pulse:
+                self.last_v_pulse = v_pulse
+                self.command(V_CHANNEL, v_pulse)
+                self.sleep_ms(20)
+
+        except Exception as e:
+            # Handle servo control errors
+            self.force_stop()
+
+        return self.motor_moving
+
+    def idle(self):
+        """
+        Stop the motors when no target is tracked
+
+        Input: None
+        Output: None
+        """
+        if self.motor_moving or self.force_stop_counter < FORCE_STOP_FRAMES:
+            # Send stop commands
+            self.command(H_CHANNEL, STOP_PULSE)
+            self.sleep_ms(10)
+            self.command(V_CHANNEL, STOP_PULSE)
+            self.sleep_ms(10)
+
+            self.force_stop_counter += 1
+            if self.force_stop_counter >= FORCE_STOP_FRAMES:
+                self.motor_moving = False
+                self.last_h_pulse = STOP_PULSE
+                self.last_v_pulse = STOP_PULSE
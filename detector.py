@@ -0,0 +1,214 @@
+"""
+Person Detector Backends for the Upper Body Tracking System
+
+Description:
+This module provides the detector backends used by main.py. Every backend exposes
+detect(img) and returns a list of bounding boxes (x, y, width, height), so the
+tracking loop does not need to know which one is active.
+
+Backends:
+- HaarDetector: the original single-stage upper body Haar cascade
+- CascadeCNNDetector: two-stage detector. A permissive Haar cascade proposes
+  candidate boxes and a small quantized person-classification CNN verifies only
+  those crops. Verdicts are cached across frames while the box keeps a high IoU
+  with its previous position, so the CNN only runs on new or changed candidates.
+
+Input:
+- Camera frames (OpenMV image objects, or numpy arrays on the host)
+- Haar cascade object for the proposal stage
+- TensorFlow Lite person-classification model for the verification stage
+
+Output:
+- List of verified person bounding boxes per frame
+
+Functions:
+- HaarDetector: Single-stage Haar cascade backend
+- TFLitePersonClassifier: On-device CNN verification stage (OpenMV "tf" module)
+- VerificationCache: Per-box CNN verdict cache keyed by IoU
+- CascadeCNNDetector: Haar proposal + CNN verification backend
+"""
+
+import kernels
+
+# ============================================================================
+# DETECTOR PARAMETERS
+# ============================================================================
+# Proposal stage runs below the normal 0.70 threshold so that the CNN, not the
+# cascade, decides what is a person
+PROPOSAL_THRESHOLD = 0.50
+PROPOSAL_SCALE_FACTOR = 1.2
+
+# Verification stage
+PERSON_SCORE = 0.60    # Minimum CNN "person" score to accept a candidate
+PERSON_INDEX = 1       # Output index of "person" (labels: no_person, person)
+
+# Verdict cache
+CACHE_IOU = 0.60       # Minimum IoU to reuse a cached verdict
+CACHE_MAX_AGE = 15     # Frames before a cached verdict is re-verified anyway
+
+# ============================================================================
+# SINGLE-STAGE HAAR BACKEND
+# ============================================================================
+class HaarDetector:
+    """
+    Original Haar cascade detector, also used as the proposal stage
+
+    Input:
+        cascade (image.HaarCascade) - Loaded Haar cascade
+        threshold (float) - Detection confidence threshold
+        scale_factor (float) - Multi-scale detection parameter
+    """
+
+    def __init__(self, cascade, threshold=0.70, scale_factor=1.2):
+        self.cascade = cascade
+        self.threshold = threshold
+        self.scale_factor = scale_factor
+
+    def detect(self, img):
+        """
+        Input: img (image.Image) - Current camera frame
+        Output: list - Detected bounding boxes (x, y, width, height)
+        """
+        return img.find_features(self.cascade, threshold=self.threshold,
+                                 scale_factor=self.scale_factor)
+
+# ============================================================================
+# CNN VERIFICATION STAGE (ON DEVICE)
+# ============================================================================
+class TFLitePersonClassifier:
+    """
+    Quantized person-classification CNN running on the OpenMV camera
+
+    The "tf" module crops the ROI and resizes it to the model input size, so
+    only the candidate box is ever passed through the network.
+
+    Input:
+        model (str) - Built-in model name or path to a .tflite file on the SD card
+        person_index (int) - Output index of the "person" class
+    """
+
+    def __init__(self, model="person_detection", person_index=PERSON_INDEX):
+        import tf
+        # Keep the model in the frame buffer heap, not the MicroPython heap
+        self.net = tf.load(model, load_to_fb=True)
+        self.person_index = person_index
+
+    def score(self, img, box):
+        """
+        Input:
+            img (image.Image) - Current camera frame
+            box (tuple) - Candidate bounding box (x, y, width, height)
+        Output: float - Person score between 0 and 1
+        """
+        for obj in self.net.classify(img, roi=box):
+            return obj.output()[self.person_index]
+        return 0.0
+
+# ============================================================================
+# VERDICT CACHE
+# ============================================================================
+class VerificationCache:
+    """
+    Caches CNN scores per candidate box across frames
+
+    An entry follows its box from frame to frame as long as the new candidate
+    overlaps it by at least min_iou. Entries that are not matched in a frame are
+    dropped, and entries older than max_age frames are re-verified.
+
+    Input:
+        min_iou (int) - Minimum fixed-point IoU to reuse a cached score
+        max_age (int) - Frames a score may be reused before re-verification
+    """
+
+    def __init__(self, min_iou=kernels.to_fixed(CACHE_IOU), max_age=CACHE_MAX_AGE):
+        self.min_iou = min_iou
+        self.max_age = max_age
+        self.entries = []      # Entries from the previous frame: [box, score, age]
+        self.current = []      # Entries seen in the current frame
+
+    def lookup(self, box):
+        """
+        Input: box (tuple) - Candidate bounding box
+        Output: float or None - Cached score, or None if the CNN must run
+        """
+        best_entry = None
+        best_iou = self.min_iou
+        for entry in self.entries:
+            iou = kernels.calculate_iou(entry[0], box)
+            if iou >= best_iou:
+                best_iou = iou
+                best_entry = entry
+
+        if best_entry is None or best_entry[2] >= self.max_age:
+            return None
+
+        # Move the entry to the current frame, following the box
+        self.entries.remove(best_entry)
+        self.current.append([box, best_entry[1], best_entry[2] + 1])
+        return best_entry[1]
+
+    def store(self, box, score):
+        """
+        Input:
+            box (tuple) - Verified bounding box
+            score (float) - CNN person score for the box
+        Output: None
+        """
+        self.current.append([box, score, 0])
+
+    def next_frame(self):
+        """
+        Drop unmatched entries and start a new frame
+
+        Input: None
+        Output: None
+        """
+        self.entries = self.current
+        self.current = []
+
+# ============================================================================
+# TWO-STAGE HAAR + CNN BACKEND
+# ============================================================================
+class CascadeCNNDetector:
+    """
+    Haar proposal stage followed by CNN verification of each candidate crop
+
+    Input:
+        proposer - Object with detect(img) returning candidate boxes
+        classifier - Object with score(img, box) returning a person score
+        min_score (float) - Minimum person score to accept a candidate
+        cache (VerificationCache) - Verdict cache, created if not given
+    """
+
+    def __init__(self, proposer, classifier, min_score=PERSON_SCORE, cache=None):
+        self.proposer = proposer
+        self.classifier = classifier
+        self.min_score = min_score
+        self.cache = cache if cache is not None else VerificationCache()
+
+        # Statistics for performance monitoring
+        self.proposals = 0     # Candidate boxes proposed by the cascade
+        self.classified = 0    # Candidates passed through the CNN
+        self.cache_hits = 0    # Candidates answered from the cache
+
+    def detect(self, img):
+        """
+        Input: img - Current camera frame
+        Output: list - Verified person bounding boxes (x, y, width, height)
+        """
+        people = []
+        for box in self.proposer.detect(img):
+            self.proposals += 1
+            score = self.cache.lookup(box)
+            if score is None:
+                score = self.classifier.score(img, box)
+                self.cache.store(box, score)
+                self.classified += 1
+            else:
+                self.cache_hits += 1
+
+            if score >= self.min_score:
+                people.append(box)
+
+        self.cache.next_frame()
+        return people
@@ -0,0 +1,108 @@
+"""
+PCA9685 PWM Driver for the Upper Body Tracking System
+
+Description:
+This module wraps the PCA9685 16-channel PWM driver used to drive the pan and
+tilt servos over I2C. It sets the 50Hz servo PWM frequency and writes pulse
+widths in microseconds to individual channels.
+
+Hardware Requirements:
+- PCA9685 PWM Driver Board
+- I2C connections between OpenMV and PCA9685
+
+Input:
+- I2C bus object (machine.I2C)
+
+Output:
+- PWM signals to servo motors
+
+Functions:
+- PCA9685.reset(): Initialize PCA9685 PWM driver
+- PCA9685.set_servo_pulse(): Send PWM signals to specific servo channel
+"""
+
+import time
+
+# ============================================================================
+# PCA9685 PWM DRIVER CONFIGURATION
+# ============================================================================
+# PCA9685 register addresses for I2C communication
+PCA9685_ADDR = 0x40    # I2C address of PCA9685
+MODE1 = 0x00           # Mode register 1
+PRESCALE = 0xFE        # Prescaler register for PWM frequency
+LED0_ON_L = 0x06       # First PWM channel register
+
+# ============================================================================
+# PCA9685 INITIALIZATION AND CONTROL
+# ============================================================================
+class PCA9685:
+    """
+    PCA9685 PWM driver on an I2C bus
+
+    Input:
+        i2c (machine.I2C) - I2C bus connected to the PCA9685
+        address (int) - I2C address of the PCA9685
+    """
+
+    def __init__(self, i2c, address=PCA9685_ADDR):
+        self.i2c = i2c
+        self.address = address
+
+    def reset(self):
+        """
+        Initialize PCA9685 PWM driver for servo control
+
+        Input: None
+        Output: Boolean - True if initialization successful, False if failed
+        """
+        try:
+            # Read current mode1 register
+            mode1 = self.i2c.readfrom_mem(self.address, MODE1, 1)[0]
+            # Put PCA9685 to sleep for configuration
+            self.i2c.writeto_mem(self.address, MODE1, bytes([mode1 | 0x10]))
+            time.sleep(0.005)
+
+            # Calculate prescaler for 50Hz PWM frequency (standard for servos)
+            prescale = 25000000 // (4096 * 50) - 1
+            self.i2c.writeto_mem(self.address, PRESCALE, bytes([prescale]))
+            time.sleep(0.005)
+
+            # Wake up PCA9685
+            self.i2c.writeto_mem(self.address, MODE1, bytes([mode1 & ~0x10]))
+            time.sleep(0.005)
+
+            # Enable auto-increment and restart
+            self.i2c.writeto_mem(self.address, MODE1, bytes([mode1 & ~0x10 | 0xa0]))
+            time.sleep(0.005)
+
+            return True
+        except Exception as e:
+            return False
+
+    def set_servo_pulse(self, channel, pulse_us):
+        """
+        Send PWM pulse to specific servo channel
+
+        Input:
+            channel (int) - Servo channel number (0-15)
+            pulse_us (int) - Pulse width in microseconds (1000-2000)
+        Output: Boolean - True if successful, False if failed
+        """
+        try:
+            # Convert microseconds to 12-bit value (0-4095)
+            pulse_count = pulse_us * 4096 // 20000
+            channel_base = LED0_ON_L + (channel * 4)
+
+            # Write PWM values to PCA9685 registers
+            self.i2c.writeto_mem(self.address, channel_base, bytes([0]))
+            time.sleep_ms(1)
+            self.i2c.writeto_mem(self.address, channel_base + 1, bytes([0]))
+            time.sleep_ms(1)
+            self.i2c.writeto_mem(self.address, channel_base + 2, bytes([pulse_count & 0xFF]))
+            time.sleep_ms(1)
+            self.i2c.writeto_mem(self.address, channel_base + 3, bytes([(pulse_count >> 8) & 0x0F]))
+            time.sleep_ms(1)
+
+            return True
+        except Exception as e:
+            return False
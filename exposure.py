@@ -0,0 +1,151 @@
+"""
+Frame-Rate-Aware Automatic Exposure Controller for the Upper Body Tracking System
+
+Description:
+After the camera has settled, auto gain and auto white balance are disabled so
+the cascade sees consistent images. This module keeps the image brightness in
+range as daylight changes. Every UPDATE_FRAMES frames it meters the mean
+brightness of the tracked box, or of the whole frame when nothing is tracked,
+and adjusts exposure time and gain towards TARGET_MEAN.
+
+Exposure time is capped by the frame-time budget of the configured frame rate,
+so a long exposure never lowers the frame rate. Exposure is raised first
+(less noise) and gain only once the exposure cap is reached; when darkening,
+gain is lowered first. Changes are made at low frequency and in limited steps,
+and never wait for the sensor, so they do not stall capture.
+
+Input:
+- Camera frames and the tracked bounding box
+- OpenMV sensor module
+
+Output:
+- Exposure time and gain settings on the camera sensor
+
+Functions:
+- exposure_cap_us(): Longest exposure that fits the frame-time budget
+- ExposureController.start(): Take over from the sensor's automatic settings
+- ExposureController.update(): Meter and adjust once every UPDATE_FRAMES frames
+"""
+
+import math
+
+# ============================================================================
+# EXPOSURE CONTROL PARAMETERS
+# ============================================================================
+TARGET_MEAN = 110        # Target mean grayscale brightness of the metered area
+DEADBAND = 12            # No adjustment while within this distance of the target
+UPDATE_FRAMES = 10       # Frames between adjustments (0.5s at 20 FPS)
+MAX_STEP = 1.4           # Largest brightness change per adjustment
+MIN_STEP = 0.7           # Smallest brightness change per adjustment
+
+# Exposure and gain limits
+EXPOSURE_BUDGET = 0.8    # Fraction of the frame time available for exposure
+MIN_EXPOSURE_US = 100    # Shortest exposure time in microseconds
+MAX_GAIN_DB = 24.0       # Highest analog gain in dB (gain ceiling 16x)
+DB_PER_LOG = 8.685889638 # 20 / ln(10), converts a brightness ratio to dB
+
+# ============================================================================
+# UTILITY FUNCTIONS
+# ============================================================================
+def exposure_cap_us(framerate):
+    """
+    Calculate the longest exposure that still reaches the frame rate
+
+    Input: framerate (int) - Configured frame rate in FPS
+    Output: int - Exposure cap in microseconds (40000 at 20 FPS)
+    """
+    return int(1000000 * EXPOSURE_BUDGET / framerate)
+
+# ============================================================================
+# EXPOSURE CONTROLLER
+# ============================================================================
+class ExposureController:
+    """
+    Low-frequency exposure and gain control loop
+
+    Input:
+        sensor - OpenMV sensor module
+        framerate (int) - Configured frame rate, sets the exposure cap
+        target_mean (int) - Target mean brightness of the metered area
+    """
+
+    def __init__(self, sensor, framerate, target_mean=TARGET_MEAN):
+        self.sensor = sensor
+        self.target_mean = target_mean
+        self.max_exposure_us = exposure_cap_us(framerate)
+
+        # Current settings and frame counter
+        self.exposure_us = self.max_exposure_us
+        self.gain_db = 0.0
+        self.frame_count = 0
+
+    def start(self):
+        """
+        Take over from the sensor's automatic exposure and gain
+
+        Input: None
+        Output: None (fixes the current settings, capped to the frame budget)
+        """
+        self.exposure_us = min(self.sensor.get_exposure_us(), self.max_exposure_us)
+        self.gain_db = min(self.sensor.get_gain_db(), MAX_GAIN_DB)
+        self.apply()
+
+    def apply(self):
+        """
+        Input: None
+        Output: None (writes exposure and gain to the sensor)
+        """
+        self.sensor.set_auto_exposure(False, exposure_us=int(self.exposure_us))
+        self.sensor.set_auto_gain(False, gain_db=self.gain_db)
+
+    def update(self, img, roi=None):
+        """
+        Meter the image and adjust exposure every UPDATE_FRAMES frames
+
+        Input:
+            img (image.Image) - Current camera frame
+            roi (tuple) - Tracked bounding box, or None to meter the whole frame
+        Output: Boolean - True if the settings were changed
+        """
+        self.frame_count += 1
+        if self.frame_count < UPDATE_FRAMES:
+            return False
+        self.frame_count = 0
+
+        # Meter the target when tracking, the whole frame when idle
+        if roi:
+            mean = img.get_statistics(roi=roi).mean()
+        else:
+            mean = img.get_statistics().mean()
+
+        if abs(mean - self.target_mean) <= DEADBAND:
+            return False
+
+        # Brightness ratio needed to reach the target, limited per step
+        ratio = self.target_mean / max(mean, 1)
+        ratio = max(MIN_STEP, min(MAX_STEP, ratio))
+        exposure_us = self.exposure_us * ratio
+        gain_db = self.gain_db
+
+        if ratio > 1:
+            # Brighten: exposure first, then gain above the frame-time cap
+            if exposure_us > self.max_exposure_us:
+                gain_db += math.log(exposure_us / self.max_exposure_us) * DB_PER_LOG
+                exposure_us = self.max_exposure_us
+        elif gain_db > 0:
+            # Darken: gain first, then exposure once gain reaches 0 dB
+            gain_db += math.log(ratio) * DB_PER_LOG
+            exposure_us = self.exposure_us
+            if gain_db < 0:
+                exposure_us = self.exposure_us * math.exp(gain_db / DB_PER_LOG)
+                gain_db = 0.0
+
+        exposure_us = max(MIN_EXPOSURE_US, min(self.max_exposure_us, exposure_us))
+        gain_db = max(0.0, min(MAX_GAIN_DB, gain_db))
+        if int(exposure_us) == int(self.exposure_us) and gain_db == self.gain_db:
+            return False
+
+        self.exposure_us = exposure_us
+        self.gain_db = gain_db
+        self.apply()
+        return True
@@ -0,0 +1,210 @@
+"""
+Host-Side Person Detector for Testing the Detector Backends on a PC
+
+Description:
+This script runs the same two-stage detector as the camera (detector.py) on a
+Linux/Windows/macOS CPU. The Haar proposal stage uses OpenCV's upper body cascade
+and the verification stage runs a local .tflite person-classification model with
+the TensorFlow Lite interpreter. It is intended for checking thresholds, cache
+behaviour and model accuracy on saved frames without flashing the camera.
+
+Host Requirements:
+- Python 3 with numpy and opencv-python
+- tflite-runtime (or full tensorflow as a fallback)
+
+Input:
+- Local .tflite model file (e.g. person_detection.tflite)
+- Grayscale or colour image files, processed in the given order as a sequence
+
+Output:
+- Detected person boxes per frame on the console
+- Proposal, CNN and cache-hit counts and average time per frame
+
+Functions:
+- load_interpreter(): Create a TensorFlow Lite interpreter for a model file
+- min_neighbors(): Map an OpenMV threshold onto OpenCV minNeighbors
+- HostHaarProposer: OpenCV Haar cascade proposal stage
+- HostPersonClassifier: TensorFlow Lite verification stage on the CPU
+- main(): Command line entry point
+
+Usage:
+    python hostDetector.py --model person_detection.tflite frames/*.png
+"""
+
+import argparse
+import time
+
+import numpy as np
+import cv2
+
+import detector
+
+# ============================================================================
+# HOST PARAMETERS
+# ============================================================================
+# OpenCV has no detection threshold like OpenMV; it is mapped onto
+# minNeighbors, one neighbour per 0.1 of threshold: 0.50 -> 1, 0.70 -> 3, 0.80 -> 4
+NEIGHBORS_PER_UNIT = 10
+NEIGHBORS_OFFSET = 4
+UPPERBODY_CASCADE = "haarcascade_upperbody.xml"
+
+# ============================================================================
+# TENSORFLOW LITE LOADING
+# ============================================================================
+def load_interpreter(model_path):
+    """
+    Create a TensorFlow Lite interpreter, preferring the small tflite-runtime
+
+    Input: model_path (str) - Path to a .tflite model file
+    Output: Interpreter - Allocated TensorFlow Lite interpreter
+    """
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        from tensorflow.lite import Interpreter
+
+    interpreter = Interpreter(model_path=model_path)
+    interpreter.allocate_tensors()
+    return interpreter
+
+# ============================================================================
+# PROPOSAL STAGE
+# ============================================================================
+def min_neighbors(threshold):
+    """
+    Input: threshold (float) - OpenMV-style detection threshold (0-1)
+    Output: int - OpenCV minNeighbors used in its place
+    """
+    return max(1, int(threshold * NEIGHBORS_PER_UNIT + 0.5) - NEIGHBORS_OFFSET)
+
+class HostHaarProposer:
+    """
+    OpenCV upper body cascade with the same parameters as HaarDetector
+
+    Input:
+        threshold (float) - OpenMV-style detection threshold (0-1)
+        scale_factor (float) - Multi-scale detection parameter
+        cascade_path (str) - Cascade XML, defaults to OpenCV's upper body model
+    """
+
+    def __init__(self, threshold=detector.PROPOSAL_THRESHOLD,
+                 scale_factor=detector.PROPOSAL_SCALE_FACTOR, cascade_path=None):
+        if cascade_path is None:
+            cascade_path = cv2.data.haarcascades + UPPERBODY_CASCADE
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        if self.cascade.empty():
+            raise IOError("Cannot load Haar cascade: " + cascade_path)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors(threshold)
+
+    def detect(self, frame):
+        """
+        Input: frame (numpy.ndarray) - Grayscale frame (height x width, uint8)
+        Output: list - Candidate bounding boxes (x, y, width, height)
+        """
+        boxes = self.cascade.detectMultiScale(frame, scaleFactor=self.scale_factor,
+                                              minNeighbors=self.min_neighbors)
+        return [tuple(int(v) for v in box) for box in boxes]
+
+# ============================================================================
+# VERIFICATION STAGE
+# ============================================================================
+class HostPersonClassifier:
+    """
+    TensorFlow Lite person classifier running on the host CPU
+
+    Crops each candidate box, resizes it to the model input size and applies
+    the same input scaling as the OpenMV "tf" module.
+
+    Input:
+        model_path (str) - Path to a local .tflite model file
+        person_index (int) - Output index of the "person" class
+    """
+
+    def __init__(self, model_path, person_index=detector.PERSON_INDEX):
+        self.interpreter = load_interpreter(model_path)
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.person_index = person_index
+
+        # Model input shape is (1, height, width, channels)
+        _, self.input_h, self.input_w, self.input_c = self.input["shape"]
+
+    def score(self, frame, box):
+        """
+        Input:
+            frame (numpy.ndarray) - Grayscale frame
+            box (tuple) - Candidate bounding box (x, y, width, height)
+        Output: float - Person score between 0 and 1
+        """
+        x, y, w, h = box
+        crop = frame[y:y + h, x:x + w]
+        crop = cv2.resize(crop, (self.input_w, self.input_h), interpolation=cv2.INTER_AREA)
+        if self.input_c == 3:
+            crop = cv2.cvtColor(crop, cv2.COLOR_GRAY2RGB)
+        data = crop.reshape((1, self.input_h, self.input_w, self.input_c)).astype(np.float32)
+
+        # Scale pixels the same way the OpenMV "tf" module does
+        dtype = self.input["dtype"]
+        if dtype == np.int8:
+            data = data - 128.0
+        elif dtype == np.float32:
+            data = data / 255.0
+        self.interpreter.set_tensor(self.input["index"], data.astype(dtype))
+        self.interpreter.invoke()
+
+        # Dequantize the output back to a probability
+        result = self.interpreter.get_tensor(self.output["index"])[0].astype(np.float32)
+        scale, zero_point = self.output["quantization"]
+        if scale:
+            result = (result - zero_point) * scale
+        return float(result[self.person_index])
+
+# ============================================================================
+# COMMAND LINE ENTRY POINT
+# ============================================================================
+def main():
+    """
+    Run the two-stage detector over a sequence of image files
+
+    Input: Command line arguments
+    Output: None (prints detections and statistics)
+    """
+    parser = argparse.ArgumentParser(description="Run the Haar + CNN person detector on the host CPU")
+    parser.add_argument("--model", required=True, help="Path to the .tflite person model")
+    parser.add_argument("--threshold", type=float, default=detector.PROPOSAL_THRESHOLD,
+                        help="Proposal stage Haar threshold")
+    parser.add_argument("--scale-factor", type=float, default=detector.PROPOSAL_SCALE_FACTOR,
+                        help="Proposal stage scale factor")
+    parser.add_argument("--min-score", type=float, default=detector.PERSON_SCORE,
+                        help="Minimum CNN person score")
+    parser.add_argument("--cascade", default=None, help="Haar cascade XML file")
+    parser.add_argument("frames", nargs="+", help="Image files, processed in order")
+    args = parser.parse_args()
+
+    person_detector = detector.CascadeCNNDetector(
+        HostHaarProposer(args.threshold, args.scale_factor, args.cascade),
+        HostPersonClassifier(args.model),
+        min_score=args.min_score)
+
+    total_time = 0.0
+    for path in args.frames:
+        frame = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if frame is None:
+            print("Skipping unreadable frame:", path)
+            continue
+
+        start = time.perf_counter()
+        people = person_detector.detect(frame)
+        total_time += time.perf_counter() - start
+        print(path, people)
+
+    frames = max(1, len(args.frames))
+    print("Proposals:", person_detector.proposals,
+          "CNN runs:", person_detector.classified,
+          "Cache hits:", person_detector.cache_hits)
+    print("Average time per frame: %.2f ms" % (total_time * 1000.0 / frames))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Micro-Benchmark for the Fixed-Point Hot-Path Kernels
+
+Description:
+This script measures the per-call cost of every kernel in kernels.py compiled
+three ways: interpreted bytecode, @micropython.native and @micropython.viper. The
+original float implementations from main.py are timed as a reference. All
+variants are built from the single kernels.py source by swapping the decorator.
+Before timing, their results are checked against each other and against the
+float reference within the tolerance of Q10 fixed-point (TOLERANCES).
+
+It runs on the OpenMV camera (kernels.py must be on the flash or SD card as
+source) and under CPython, where the code emitters do not exist and every
+variant runs as plain Python.
+
+Input:
+- kernels.py source file in the current directory
+
+Output:
+- Serial console / terminal table of microseconds per call for each variant
+
+Functions:
+- load_variant(): Compile kernels.py with a given decorator
+- time_per_call(): Average cost of one kernel call in microseconds
+- run_benchmark(): Check and time every kernel and print the table
+"""
+
+import time
+
+# ============================================================================
+# BENCHMARK PARAMETERS
+# ============================================================================
+ITERATIONS = 2000      # Calls per measurement
+SAMPLE_BOXES = 32      # Number of random box pairs used as input
+KERNEL_SOURCE = "kernels.py"
+
+# Largest allowed difference from the float reference, per kernel
+# (calculate_iou is compared as a fraction, the others in pixels / microseconds)
+TOLERANCES = {
+    "calculate_iou": 1.0 / 1024,   # Q10 result is truncated to 1/1024
+    "smooth_box": 0,               # Reference uses the same Q10 alpha, must truncate alike
+    "calculate_error": 0,
+    "select_pulse": 0,
+}
+
+# Decorator used by kernels.py, replaced to build the other variants
+VIPER_DECORATOR = "@micropython.viper\n"
+VARIANTS = (
+    ("interpreted", ""),
+    ("native", "@micropython.native\n"),
+    ("viper", VIPER_DECORATOR),
+)
+
+# Microsecond timer on MicroPython, perf_counter on CPython
+try:
+    ticks_us = time.ticks_us
+    ticks_diff = time.ticks_diff
+except AttributeError:
+    def ticks_us():
+        return int(time.perf_counter() * 1000000)
+
+    def ticks_diff(end, start):
+        return end - start
+
+# ============================================================================
+# ORIGINAL FLOAT IMPLEMENTATIONS (REFERENCE)
+# ============================================================================
+def float_iou(boxA, boxB):
+    xA = max(boxA[0], boxB[0])
+    yA = max(boxA[1], boxB[1])
+    xB = min(boxA[0] + boxA[2], boxB[0] + boxB[2])
+    yB = min(boxA[1] + boxA[3], boxB[1] + boxB[3])
+    interArea = max(0, xB - xA) * max(0, yB - yA)
+    return interArea / float(boxA[2] * boxA[3] + boxB[2] * boxB[3] - interArea)
+
+def float_smooth(new_box, old_box, alpha):
+    return (int(alpha * new_box[0] + (1 - alpha) * old_box[0]),
+            int(alpha * new_box[1] + (1 - alpha) * old_box[1]),
+            int(alpha * new_box[2] + (1 - alpha) * old_box[2]),
+            int(alpha * new_box[3] + (1 - alpha) * old_box[3]))
+
+def float_error(box, center_x, center_y):
+    return (center_x - (box[0] + box[2] // 2), center_y - (box[1] + box[3] // 2))
+
+def float_pulse(error, small_error, large_error, pulses):
+    if abs(error) > small_error:
+        if error > 0:
+            return pulses[2] if abs(error) > large_error else pulses[1]
+        return pulses[4] if abs(error) > large_error else pulses[3]
+    return pulses[0]
+
+# ============================================================================
+# VARIANT LOADING
+# ============================================================================
+def load_variant(source, decorator):
+    """
+    Compile the kernels with a different code emitter decorator
+
+    Input:
+        source (str) - kernels.py source code
+        decorator (str) - Replacement for the viper decorator line
+    Output: dict - Namespace holding the compiled kernels
+    """
+    namespace = {"__name__": "kernels"}
+    exec(source.replace(VIPER_DECORATOR, decorator), namespace)
+    return namespace
+
+def make_boxes(count):
+    """
+    Generate deterministic random box pairs inside a QVGA frame
+
+    Input: count (int) - Number of box pairs
+    Output: list - Pairs of (x, y, width, height) tuples
+    """
+    seed = 12345
+    values = []
+    for i in range(count * 8):
+        # Small LCG so the inputs are identical on every platform
+        seed = (seed * 1103515245 + 12345) & 0x7FFFFFFF
+        values.append(seed >> 16)
+
+    pairs = []
+    for i in range(count):
+        v = values[i * 8:i * 8 + 8]
+        boxA = (v[0] % 240, v[1] % 160, 20 + v[2] % 80, 20 + v[3] % 80)
+        boxB = (v[4] % 240, v[5] % 160, 20 + v[6] % 80, 20 + v[7] % 80)
+        pairs.append((boxA, boxB))
+    return pairs
+
+def max_difference(result, expected, scale):
+    """
+    Largest difference between a fixed-point result and the float reference
+
+    Input:
+        result (int or tuple) - Fixed-point kernel result
+        expected (number or tuple) - Float reference result
+        scale (float) - Factor converting the result to the reference unit
+    Output: float - Largest absolute difference over all elements
+    """
+    if not isinstance(result, tuple):
+        result = (result,)
+        expected = (expected,)
+    return max(abs(r * scale - e) for r, e in zip(result, expected))
+
+# ============================================================================
+# TIMING
+# ============================================================================
+def time_per_call(call, pairs):
+    """
+    Measure the average cost of one call, minus the loop overhead
+
+    Input:
+        call (function) - Function taking a box pair
+        pairs (list) - Box pairs cycled through as input
+    Output: float - Microseconds per call
+    """
+    count = len(pairs)
+
+    start = ticks_us()
+    for i in range(ITERATIONS):
+        pair = pairs[i % count]
+    overhead = ticks_diff(ticks_us(), start)
+
+    start = ticks_us()
+    for i in range(ITERATIONS):
+        call(pairs[i % count])
+    elapsed = ticks_diff(ticks_us(), start)
+
+    return max(0, elapsed - overhead) / ITERATIONS
+
+def run_benchmark():
+    """
+    Check that all variants agree with each other and with the float
+    reference, then time every kernel
+
+    Input: None
+    Output: None (prints results table)
+    """
+    with open(KERNEL_SOURCE) as f:
+        source = f.read()
+
+    variants = []
+    for name, decorator in VARIANTS:
+        try:
+            variants.append((name, load_variant(source, decorator)))
+        except Exception as e:
+            print("Cannot build", name, "variant:", e)
+
+    try:
+        import micropython
+    except ImportError:
+        print("No code emitters on this platform: all variants run as plain Python")
+
+    pairs = make_boxes(SAMPLE_BOXES)
+    pulses = (1520, 1525, 1530, 1475, 1455)
+    alpha = 0.7
+    # Reference smoothing with alpha quantised like kernels.to_fixed(); the
+    # products are exact in double precision, so only truncation can differ
+    alpha_q10 = int(alpha * 1024 + 0.5) / 1024.0
+
+    # Kernel name -> (float reference call, builder for a fixed-point call,
+    #                 scale from the fixed-point result to the reference unit)
+    benchmarks = (
+        ("calculate_iou",
+         lambda p: float_iou(p[0], p[1]),
+         lambda k: (lambda p, f=k["calculate_iou"]: f(p[0], p[1])),
+         1.0 / 1024),
+        ("smooth_box",
+         lambda p: float_smooth(p[0], p[1], alpha_q10),
+         lambda k: (lambda p, f=k["smooth_box"], q=k["to_fixed"](alpha): f(p[0], p[1], q)),
+         1),
+        ("calculate_error",
+         lambda p: float_error(p[0], 160, 120),
+         lambda k: (lambda p, f=k["calculate_error"]: f(p[0], 160, 120)),
+         1),
+        ("select_pulse",
+         lambda p: float_pulse(p[0][0] - 120, 15, 40, pulses),
+         lambda k: (lambda p, f=k["select_pulse"]: f(p[0][0] - 120, 15, 40, pulses)),
+         1),
+    )
+
+    header = "%-16s %10s" % ("Kernel (us/call)", "float")
+    for name, kernels in variants:
+        header += " %12s" % name
+    print(header)
+
+    for kernel_name, float_call, build, scale in benchmarks:
+        calls = [build(kernels) for name, kernels in variants]
+
+        # All fixed-point variants must return identical results, and stay
+        # within the tolerance of the float reference
+        for pair in pairs:
+            expected = calls[0](pair)
+            for call in calls[1:]:
+                if call(pair) != expected:
+                    print("Mismatch in", kernel_name, "for", pair)
+            difference = max_difference(expected, float_call(pair), scale)
+            if difference > TOLERANCES[kernel_name]:
+                print("Mismatch with float in", kernel_name, "for", pair, "by", difference)
+
+        row = "%-16s %10.2f" % (kernel_name, time_per_call(float_call, pairs))
+        for call in calls:
+            row += " %12.2f" % time_per_call(call, pairs)
+        print(row)
+
+
+run_benchmark()
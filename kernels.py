@@ -0,0 +1,170 @@
+"""
+Fixed-Point Hot-Path Kernels for the Upper Body Tracking System
+
+Description:
+The small functions that run on every detection and every frame are collected
+here and written in integer fixed-point arithmetic, so they can be compiled by
+the MicroPython viper emitter to machine code without any float division.
+Fractions are stored as integers scaled by FIXED_ONE (Q10, 1.0 == 1024).
+
+Under CPython the micropython module does not exist, so the decorators fall back
+to plain functions and the kernels run as ordinary Python with identical
+results. This lets the kernels be checked and benchmarked on a PC
+(see kernelBenchmark.py).
+
+Input:
+- Bounding boxes as (x, y, width, height) tuples
+- Fixed-point fractions created with to_fixed()
+
+Output:
+- Fixed-point IoU, smoothed boxes, centre errors and servo pulses
+
+Functions:
+- to_fixed(): Convert a float fraction to Q10 fixed-point (setup only)
+- calculate_iou(): Intersection over Union between two bounding boxes (Q10)
+- smooth_box(): Exponential smoothing of a bounding box
+- calculate_error(): Offset of the box centre from the image centre
+- select_pulse(): Servo pulse for an error using a pulse table
+"""
+
+try:
+    import micropython
+except ImportError:
+    # CPython: no code emitters, run the kernels as plain Python
+    class micropython:
+        @staticmethod
+        def native(func):
+            return func
+
+        @staticmethod
+        def viper(func):
+            return func
+
+        @staticmethod
+        def const(value):
+            return value
+
+const = micropython.const
+
+# ============================================================================
+# FIXED-POINT FORMAT
+# ============================================================================
+FIXED_SHIFT = const(10)    # Q10 fixed-point
+FIXED_ONE = const(1024)    # 1.0 in fixed-point
+
+# Pulse table layout used by select_pulse()
+PULSE_STOP = const(0)        # Index of the stop pulse
+PULSE_POS_SLOW = const(1)    # Index of the slow pulse for a positive error
+PULSE_POS_FAST = const(2)    # Index of the fast pulse for a positive error
+PULSE_NEG_SLOW = const(3)    # Index of the slow pulse for a negative error
+PULSE_NEG_FAST = const(4)    # Index of the fast pulse for a negative error
+
+def to_fixed(value):
+    """
+    Convert a fraction to fixed-point, used once at setup time
+
+    Input: value (float) - Fraction such as 0.7
+    Output: int - Fixed-point value (0.7 -> 717)
+    """
+    return int(value * FIXED_ONE + 0.5)
+
+# ============================================================================
+# TRACKING KERNELS
+# ============================================================================
+@micropython.viper
+def calculate_iou(boxA, boxB) -> int:
+    """
+    Calculate Intersection over Union (IoU) between two bounding boxes
+    Used for object tracking consistency between frames
+
+    Input:
+        boxA (tuple) - First bounding box (x, y, width, height)
+        boxB (tuple) - Second bounding box (x, y, width, height)
+    Output:
+        int - IoU in fixed-point, 0 to FIXED_ONE (higher = more overlap)
+    """
+    ax = int(boxA[0])
+    ay = int(boxA[1])
+    aw = int(boxA[2])
+    ah = int(boxA[3])
+    bx = int(boxB[0])
+    by = int(boxB[1])
+    bw = int(boxB[2])
+    bh = int(boxB[3])
+
+    # Calculate intersection coordinates
+    xA = ax if ax > bx else bx
+    yA = ay if ay > by else by
+    xB = ax + aw if ax + aw < bx + bw else bx + bw
+    yB = ay + ah if ay + ah < by + bh else by + bh
+
+    # No overlap
+    if xB <= xA:
+        return 0
+    if yB <= yA:
+        return 0
+
+    interArea = (xB - xA) * (yB - yA)
+    unionArea = aw * ah + bw * bh - interArea
+    if unionArea <= 0:
+        return 0
+    return (interArea << FIXED_SHIFT) // unionArea
+
+@micropython.viper
+def smooth_box(new_box, old_box, alpha: int):
+    """
+    Apply exponential smoothing to reduce tracking box jitter
+
+    Input:
+        new_box (tuple) - Box detected in the current frame
+        old_box (tuple) - Previous smoothed box
+        alpha (int) - Fixed-point weight of the new box (0.7 -> 717)
+    Output:
+        tuple - Smoothed bounding box (x, y, width, height)
+    """
+    keep = FIXED_ONE - alpha
+    # Truncate like int() in the original float code (box values are never negative)
+    x = (alpha * int(new_box[0]) + keep * int(old_box[0])) >> FIXED_SHIFT
+    y = (alpha * int(new_box[1]) + keep * int(old_box[1])) >> FIXED_SHIFT
+    w = (alpha * int(new_box[2]) + keep * int(old_box[2])) >> FIXED_SHIFT
+    h = (alpha * int(new_box[3]) + keep * int(old_box[3])) >> FIXED_SHIFT
+    return (x, y, w, h)
+
+@micropython.viper
+def calculate_error(box, center_x: int, center_y: int):
+    """
+    Calculate the distance of the box centre from the image centre
+
+    Input:
+        box (tuple) - Tracked bounding box (x, y, width, height)
+        center_x (int) - Image centre X coordinate
+        center_y (int) - Image centre Y coordinate
+    Output:
+        tuple - (x_error, y_error), positive when the target is left/above
+    """
+    x_error = center_x - (int(box[0]) + (int(box[2]) >> 1))
+    y_error = center_y - (int(box[1]) + (int(box[3]) >> 1))
+    return (x_error, y_error)
+
+@micropython.viper
+def select_pulse(error: int, small_error: int, large_error: int, pulses):
+    """
+    Choose the servo pulse for one axis from its error
+
+    Input:
+        error (int) - Signed error in pixels
+        small_error (int) - Minimum error to trigger slow movement
+        large_error (int) - Error threshold for fast movement
+        pulses (tuple) - Pulse table (stop, pos_slow, pos_fast, neg_slow, neg_fast)
+    Output:
+        int - Pulse width in microseconds
+    """
+    if error > small_error:
+        if error > large_error:
+            return pulses[PULSE_POS_FAST]
+        return pulses[PULSE_POS_SLOW]
+    if 0 - error > small_error:
+        if 0 - error > large_error:
+            return pulses[PULSE_NEG_FAST]
+        return pulses[PULSE_NEG_SLOW]
+    return pulses[PULSE_STOP]
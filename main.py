@@ -1,7 +1,7 @@
 """
 Upper Body Tracking System using OpenMV Camera and Servo Control
 
-Authors: 
+Authors:
     Author 1: [Qianwen Shen]: motor rotation algorithm
     Author 2: [Hongyu Li]: camera tracking algorithm, integration of two features
     Author 3: [Zijun Zhou]: camera tracking algorithm
@@ -21,31 +21,84 @@ Hardware Requirements:
 Input:
 - Camera feed from OpenMV sensor
 - Haar cascade file: "haarcascade_upperbody.cascade"
+- Optional tuned parameters: "tuned_config.json" written by autoTuner.py
 - I2C communication with PCA9685
 
 Output:
-- Real-time tracking display on camera
+- Real-time tracking display on camera (RUN_MODE "ide"), or a decimated
+  JPEG preview (RUN_MODE "preview"), or none at all (RUN_MODE "headless")
 - Servo motor control signals via PCA9685
+- Optional session recording on the SD card (RECORD_SESSION), read back
+  on a PC with recordingReader.py
 - PWM signals to servo motors for pan/tilt movement
 
-Functions:
-- reset_pca9685(): Initialize PCA9685 PWM driver
-- set_servo_pulse(): Send PWM signals to specific servo channel
-- calculate_iou(): Calculate Intersection over Union for object tracking
-- force_stop_motors(): Emergency stop for all servo motors
+Modules:
+- driver.py: PCA9685 PWM driver (reset, set_servo_pulse)
+- detector.py: Detector backends
+- tracker.py: IoU-based target tracking and smoothing
+- controller.py: Servo pulse selection and motor stop handling
+- kernels.py: Fixed-point hot-path kernels compiled with the viper code emitter
+- exposure.py: Frame-rate-aware automatic exposure and gain control
+- preview.py: Headless run mode and decimated debug preview
+- occupancy.py: Pan/tilt occupancy map for slewing to the next subject
+- recorder.py: Session recorder writing frames and decisions to the SD card
+
+The modules can be precompiled to .mpy or frozen into the firmware with
+buildMpy.py; main.py itself only wires them together and runs the loop.
+
+Detector Backends (see detector.py):
+- "haar": Single-stage upper body Haar cascade (default)
+- "haar_cnn": Permissive Haar proposals verified by a quantized person CNN
 """
 
 import sensor, image, time
 import gc
+import json
 from machine import I2C
+import driver
+import detector
+import tracker
+import controller
+import exposure
+import preview
+import occupancy
+import recorder
 
 # Enable memory management for stable operation
 gc.enable()
 gc.collect()
 
+# ============================================================================
+# RUN MODE
+# ============================================================================
+# "ide": annotate and stream every frame to the OpenMV IDE (development)
+# "headless": no drawing and no frame buffer transfer (production)
+# "preview": headless with an annotated JPEG frame every PREVIEW_INTERVAL frames
+# "compare": cycle through the three modes and print their FPS side by side
+RUN_MODE = "ide"
+PREVIEW_INTERVAL = 30      # Frames between preview frames
+PREVIEW_REQUEST_PIN = None # Pin name (e.g. "P9") pulled low to request a preview
+
+# ============================================================================
+# TUNED PARAMETERS
+# ============================================================================
+# Optional parameters from autoTuner.py; missing values keep the defaults below
+# and in tracker.py / controller.py
+CONFIG_FILE = "tuned_config.json"
+try:
+    with open(CONFIG_FILE) as f:
+        tuned = json.load(f)["params"]
+except (OSError, ValueError, KeyError):
+    tuned = {}
+
 # ============================================================================
 # CAMERA INITIALIZATION
 # ============================================================================
+# Frame rate, also caps the exposure time of the exposure controller
+FRAMERATE = 20
+# Keep adjusting exposure and gain after the start-up settle
+AUTO_EXPOSURE = True
+
 # Initialize camera with grayscale mode for better processing speed
 sensor.reset()
 sensor.set_pixformat(sensor.GRAYSCALE)  # Grayscale for faster processing
@@ -53,7 +106,13 @@ sensor.set_framesize(sensor.QVGA)       # 320x240 resolution
 sensor.skip_frames(time=2000)           # Wait for camera to stabilize
 sensor.set_auto_gain(False)             # Disable auto gain for consistent exposure
 sensor.set_auto_whitebal(False)         # Disable auto white balance
-sensor.set_framerate(20)                # Set frame rate to 20 FPS
+sensor.set_framerate(FRAMERATE)         # Set frame rate to 20 FPS
+
+# Exposure controller takes over from the settled automatic exposure,
+# capping exposure time so it fits the frame-time budget
+exposure_controller = exposure.ExposureController(sensor, FRAMERATE)
+if AUTO_EXPOSURE:
+    exposure_controller.start()
 
 # Get image dimensions and calculate center point
 WIDTH = sensor.width()      # Image width (320 pixels)
@@ -62,192 +121,112 @@ CENTER_X = WIDTH // 2       # Center X coordinate (160)
 CENTER_Y = HEIGHT // 2      # Center Y coordinate (120)
 
 # ============================================================================
-# PCA9685 PWM DRIVER CONFIGURATION
+# PCA9685 INITIALIZATION
 # ============================================================================
-# PCA9685 register addresses for I2C communication
-PCA9685_ADDR = 0x40    # I2C address of PCA9685
-MODE1 = 0x00           # Mode register 1
-PRESCALE = 0xFE        # Prescaler register for PWM frequency
-LED0_ON_L = 0x06       # First PWM channel register
-
 # Create I2C object for communication with PCA9685
 # I2C(2) uses pins P4 (SDA) and P5 (SCL) on OpenMV
 i2c = I2C(2, freq=100000)  # 100kHz I2C frequency
 
-# ============================================================================
-# PCA9685 INITIALIZATION AND CONTROL FUNCTIONS
-# ============================================================================
-def reset_pca9685():
-    """
-    Initialize PCA9685 PWM driver for servo control
-    
-    Input: None
-    Output: Boolean - True if initialization successful, False if failed
-    """
-    try:
-        # Read current mode1 register
-        mode1 = i2c.readfrom_mem(PCA9685_ADDR, MODE1, 1)[0]
-        # Put PCA9685 to sleep for configuration
-        i2c.writeto_mem(PCA9685_ADDR, MODE1, bytes([mode1 | 0x10]))
-        time.sleep(0.005)
-
-        # Calculate prescaler for 50Hz PWM frequency (standard for servos)
-        prescale = 25000000 // (4096 * 50) - 1
-        i2c.writeto_mem(PCA9685_ADDR, PRESCALE, bytes([prescale]))
-        time.sleep(0.005)
-
-        # Wake up PCA9685
-        i2c.writeto_mem(PCA9685_ADDR, MODE1, bytes([mode1 & ~0x10]))
-        time.sleep(0.005)
-
-        # Enable auto-increment and restart
-        i2c.writeto_mem(PCA9685_ADDR, MODE1, bytes([mode1 & ~0x10 | 0xa0]))
-        time.sleep(0.005)
-
-        return True
-    except Exception as e:
-        return False
-
-def set_servo_pulse(channel, pulse_us):
-    """
-    Send PWM pulse to specific servo channel
-    
-    Input: 
-        channel (int) - Servo channel number (0-15)
-        pulse_us (int) - Pulse width in microseconds (1000-2000)
-    Output: Boolean - True if successful, False if failed
-    """
-    try:
-        # Convert microseconds to 12-bit value (0-4095)
-        pulse_count = pulse_us * 4096 // 20000
-        channel_base = LED0_ON_L + (channel * 4)
-
-        # Write PWM values to PCA9685 registers
-        i2c.writeto_mem(PCA9685_ADDR, channel_base, bytes([0]))
-        time.sleep_ms(1)
-        i2c.writeto_mem(PCA9685_ADDR, channel_base + 1, bytes([0]))
-        time.sleep_ms(1)
-        i2c.writeto_mem(PCA9685_ADDR, channel_base + 2, bytes([pulse_count & 0xFF]))
-        time.sleep_ms(1)
-        i2c.writeto_mem(PCA9685_ADDR, channel_base + 3, bytes([(pulse_count >> 8) & 0x0F]))
-        time.sleep_ms(1)
-
-        return True
-    except Exception as e:
-        return False
-
 # Initialize PCA9685 PWM driver
-reset_status = reset_pca9685()
-
-# ============================================================================
-# SERVO CONTROL PARAMETERS
-# ============================================================================
-# Servo pulse width values in microseconds
-STOP_PULSE = 1520      # Neutral position (no movement)
-FORWARD_PULSE = 1530   # Fast forward movement
-REVERSE_PULSE = 1455   # Fast reverse movement  
-SLOW_FORWARD = 1525    # Slow forward movement
-SLOW_REVERSE = 1475    # Slow reverse movement
-
-# Servo channel assignments on PCA9685
-H_CHANNEL = 0  # Horizontal servo channel
-V_CHANNEL = 1  # Vertical servo channel
+pwm = driver.PCA9685(i2c)
+reset_status = pwm.reset()
 
 # ============================================================================
 # OBJECT DETECTION SETUP
 # ============================================================================
+# Detector backend: "haar" (cascade only) or "haar_cnn" (cascade + CNN verification)
+DETECTOR_BACKEND = "haar"
+PERSON_MODEL = "person_detection"  # Built-in model name or .tflite file on SD card
+
 # Load Haar cascade for upper body detection
 upperbody_cascade = image.HaarCascade("haarcascade_upperbody.cascade", stages=17)
 
+if DETECTOR_BACKEND == "haar_cnn":
+    # Permissive cascade proposes candidates, CNN verifies only those crops
+    upperbody_detector = detector.CascadeCNNDetector(
+        detector.HaarDetector(upperbody_cascade,
+                              threshold=detector.PROPOSAL_THRESHOLD,
+                              scale_factor=detector.PROPOSAL_SCALE_FACTOR),
+        detector.TFLitePersonClassifier(PERSON_MODEL))
+else:
+    # threshold=0.70: Detection confidence threshold
+    # scale_factor=1.2: Multi-scale detection parameter
+    upperbody_detector = detector.HaarDetector(upperbody_cascade,
+                                               threshold=tuned.get("threshold", 0.70),
+                                               scale_factor=tuned.get("scale_factor", 1.2))
+
 # ============================================================================
-# TRACKING CONTROL PARAMETERS
+# TRACKING AND SERVO CONTROL SETUP
 # ============================================================================
-# Error thresholds for servo movement decisions
-SMALL_ERROR = 15   # Minimum error to trigger slow movement
-LARGE_ERROR = 40   # Error threshold for fast movement
+# No detection for this long while idle stops the motors
+IDLE_TIMEOUT_MS = 500
 
-# Tracking loss management
-MAX_LOST_FRAMES = 3    # Frames to wait before considering target lost
-FORCE_STOP_FRAMES = 5  # Frames to ensure complete motor stop
-force_stop_counter = 0
+# Target tracker (MAX_LOST_FRAMES, MIN_IOU, SMOOTHING_ALPHA in tracker.py)
+target_tracker = tracker.Tracker(
+    max_lost_frames=tuned.get("max_lost_frames", tracker.MAX_LOST_FRAMES),
+    alpha=tuned.get("smoothing_alpha", tracker.SMOOTHING_ALPHA))
+target_tracker.last_detection_time = time.ticks_ms()
+
+# Servo controller (pulse widths, channels and error thresholds in controller.py)
+servo_controller = controller.ServoController(
+    pwm, CENTER_X, CENTER_Y,
+    small_error=tuned.get("small_error", controller.SMALL_ERROR),
+    large_error=tuned.get("large_error", controller.LARGE_ERROR))
 
-# ============================================================================
-# INITIAL SERVO POSITIONING
-# ============================================================================
 # Set both servos to neutral position at startup
-set_servo_pulse(H_CHANNEL, STOP_PULSE)
-time.sleep_ms(100)
-set_servo_pulse(V_CHANNEL, STOP_PULSE)
-time.sleep(1)
+servo_controller.center()
 
 # ============================================================================
-# TRACKING STATE VARIABLES
+# OCCUPANCY MAP SETUP
 # ============================================================================
-# Target tracking variables
-last_tracked_pos = None    # Last known position of tracked object
-track_lost_count = 0       # Counter for consecutive frames with no detection
+# After a target loss, slew to where somebody was seen most recently
+OCCUPANCY_SLEW = True
+SLEW_MARGIN_MS = 1000   # Give up slewing this long after the estimated slew time
 
-# Motor status variables
-last_h_pulse = STOP_PULSE  # Last horizontal servo pulse value
-last_v_pulse = STOP_PULSE  # Last vertical servo pulse value
+occupancy_map = occupancy.OccupancyMap(WIDTH, HEIGHT)
+reacquisition_timer = occupancy.ReacquisitionTimer()
+slew_cell = None        # Grid cell being slewed to, None when not slewing
+slew_start = 0          # Timestamp the slew started
+slew_timeout = 0        # Time allowed for the current slew in milliseconds
+slewed = False          # True if the last loss was followed by a slew
+
+# ============================================================================
+# DEBUG PREVIEW SETUP
+# ============================================================================
+request_pin = None
+if PREVIEW_REQUEST_PIN:
+    import pyb
+    request_pin = pyb.Pin(PREVIEW_REQUEST_PIN, pyb.Pin.IN, pyb.Pin.PULL_UP)
 
-# Motor movement tracking
-motor_moving = False           # Flag indicating if motors are currently moving
-last_detection_time = time.ticks_ms()  # Timestamp of last successful detection
+if RUN_MODE == "compare":
+    debug_preview = preview.DebugPreview(preview.MODE_IDE, PREVIEW_INTERVAL, request_pin=request_pin)
+    fps_comparison = preview.FpsComparison(debug_preview)
+else:
+    debug_preview = preview.DebugPreview(RUN_MODE, PREVIEW_INTERVAL, request_pin=request_pin)
 
 # ============================================================================
-# UTILITY FUNCTIONS
+# SESSION RECORDING SETUP
 # ============================================================================
-def calculate_iou(boxA, boxB):
-    """
-    Calculate Intersection over Union (IoU) between two bounding boxes
-    Used for object tracking consistency between frames
-    
-    Input:
-        boxA (tuple) - First bounding box (x, y, width, height)
-        boxB (tuple) - Second bounding box (x, y, width, height)
-    Output:
-        float - IoU value between 0 and 1 (higher = more overlap)
-    """
-    # Calculate intersection coordinates
-    xA = max(boxA[0], boxB[0])
-    yA = max(boxA[1], boxB[1])
-    xB = min(boxA[0] + boxA[2], boxB[0] + boxB[2])
-    yB = min(boxA[1] + boxA[3], boxB[1] + boxB[3])
-
-    # Calculate intersection area
-    interArea = max(0, xB - xA) * max(0, yB - yA)
-
-    # Calculate individual box areas
-    boxAArea = boxA[2] * boxA[3]
-    boxBArea = boxB[2] * boxB[3]
-
-    # Calculate IoU
-    iou = interArea / float(boxAArea + boxBArea - interArea)
-    return iou
-
-def force_stop_motors():
-    """
-    Emergency stop function for all servo motors
-    Sends multiple stop commands to ensure motors halt
-    
-    Input: None
-    Output: None (modifies global motor state variables)
-    """
-    global force_stop_counter, motor_moving, last_h_pulse, last_v_pulse
-
-    # Send multiple stop commands for reliability
-    for i in range(3):
-        set_servo_pulse(H_CHANNEL, STOP_PULSE)
-        time.sleep_ms(10)
-        set_servo_pulse(V_CHANNEL, STOP_PULSE)
-        time.sleep_ms(10)
-
-    # Reset motor state variables
-    last_h_pulse = STOP_PULSE
-    last_v_pulse = STOP_PULSE
-    motor_moving = False
-    force_stop_counter = 0
+# Record frames, detections, tracked box and pulses to the SD card for replay
+# with recordingReader.py / autoTuner.py
+RECORD_SESSION = False
+RECORD_ENCODING = None                    # recorder.ENCODING_JPEG or ENCODING_RAW; None
+                                          # picks RAW when every frame is annotated
+                                          # ("ide" run mode), JPEG otherwise
+RECORD_FRAME_EVERY = 1                    # Store every Nth image, decisions always
+RECORD_FRAMES = 0                         # Close the recording after this many frames,
+                                          # 0 records until power-off
+RECORD_BUFFER_SIZE = None                 # Bytes, None sizes it from the frame and free heap
+
+session_recorder = None
+if RECORD_SESSION:
+    # JPEG frames are compressed after annotation, so annotated frames have no image
+    annotate_all = RUN_MODE == "ide"
+    record_encoding = RECORD_ENCODING
+    if record_encoding is None:
+        record_encoding = recorder.ENCODING_RAW if annotate_all else recorder.ENCODING_JPEG
+    session_recorder = recorder.SessionRecorder(WIDTH, HEIGHT, record_encoding, RECORD_FRAME_EVERY,
+                                                size=RECORD_BUFFER_SIZE, annotate_all=annotate_all)
 
 # ============================================================================
 # MAIN TRACKING LOOP
@@ -264,157 +243,111 @@ while(True):
     # Capture current frame from camera
     img = sensor.snapshot()
 
-    # Detect upper body objects in current frame
-    # threshold=0.70: Detection confidence threshold
-    # scale_factor=1.2: Multi-scale detection parameter
-    upperbody_objects = img.find_features(upperbody_cascade, threshold=0.70, scale_factor=1.2)
-
-    # Initialize tracking variables for current frame
-    tracked_object = None
+    # Detect upper body objects in current frame with the selected backend
+    upperbody_objects = upperbody_detector.detect(img)
     current_time = time.ticks_ms()
 
+    # Project detections into the occupancy map at the current heading
+    occupancy_map.update_heading(current_time, servo_controller.h_command, servo_controller.v_command)
+    occupancy_map.add_detections(upperbody_objects, current_time)
+
     # ========================================================================
     # OBJECT TRACKING LOGIC
     # ========================================================================
-    # Case 1: Currently tracking a target
-    if last_tracked_pos:
-        best_match = None
-        best_score = 0
-
-        # Find best matching object using IoU
-        for obj in upperbody_objects:
-            iou = calculate_iou(last_tracked_pos, obj)
-            if iou > best_score and iou > 0.3:  # Minimum 30% overlap required
-                best_score = iou
-                best_match = obj
-
-        if best_match:
-            # Successfully matched previous target
-            tracked_object = best_match
-            track_lost_count = 0
-            last_detection_time = current_time
-        else:
-            # Target lost, increment counter
-            track_lost_count += 1
-
-            # Stop tracking if target lost for too many frames
-            if track_lost_count > MAX_LOST_FRAMES:
-                last_tracked_pos = None
-                force_stop_motors()
-
-    # Case 2: Not currently tracking a target
-    if not last_tracked_pos:
-        if upperbody_objects:
-            # Select largest detected object as new target
-            tracked_object = max(upperbody_objects, key=lambda r: r[2] * r[3])
-            track_lost_count = 0
-            last_detection_time = current_time
-        else:
-            # No objects detected, check if motors should stop
-            time_since_detection = time.ticks_diff(current_time, last_detection_time)
-            if time_since_detection > 500:  # 500ms timeout
-                if motor_moving:
-                    force_stop_motors()
+    tracked_object = target_tracker.update(upperbody_objects, current_time)
+
+    # Stop motors as soon as the target has been lost for too many frames
+    if target_tracker.target_lost:
+        servo_controller.force_stop()
+
+        # The tracker may lock onto another detection in the same frame; only a
+        # frame without any target starts the reacquisition timer and a slew
+        if tracked_object is None:
+            reacquisition_timer.lost(current_time)
+
+            # Slew to the most recently active cell instead of idling
+            slew_cell = occupancy_map.best_cell(current_time) if OCCUPANCY_SLEW else None
+            slew_start = current_time
+            slewed = slew_cell is not None
+            if slewed:
+                # A cell up to 180 degrees away takes seconds to reach
+                slew_timeout = occupancy_map.slew_time_ms(
+                    slew_cell, servo_controller.large_error) + SLEW_MARGIN_MS
+
+    # Meter the target (or whole frame when idle) before anything is drawn
+    if AUTO_EXPOSURE:
+        exposure_controller.update(img, tracked_object)
+
+    # Record the frame before it is annotated; pulses and JPEG are added below
+    if session_recorder:
+        session_recorder.record(img, current_time, upperbody_objects, tracked_object)
 
     # ========================================================================
     # SERVO CONTROL LOGIC
     # ========================================================================
-    if tracked_object:
-        # Apply smoothing to reduce jitter
-        if last_tracked_pos:
-            alpha = 0.7  # Smoothing factor (0.7 = 70% new, 30% old)
-            x = int(alpha * tracked_object[0] + (1 - alpha) * last_tracked_pos[0])
-            y = int(alpha * tracked_object[1] + (1 - alpha) * last_tracked_pos[1])
-            w = int(alpha * tracked_object[2] + (1 - alpha) * last_tracked_pos[2])
-            h = int(alpha * tracked_object[3] + (1 - alpha) * last_tracked_pos[3])
-            tracked_object = (x, y, w, h)
-
-        # Update last known position
-        last_tracked_pos = tracked_object
+    # Annotate only the frames that are displayed (never when headless)
+    draw_frame = debug_preview.begin_frame()
 
+    if tracked_object:
         # ====================================================================
         # VISUAL FEEDBACK
         # ====================================================================
         # Draw tracking rectangle and center cross on image
-        img.draw_rectangle(tracked_object, color=(255, 0, 0))  # Red rectangle
-        center_x = tracked_object[0] + tracked_object[2] // 2
-        center_y = tracked_object[1] + tracked_object[3] // 2
-        img.draw_cross(center_x, center_y, color=(255, 0, 0))  # Red cross
-
+        if draw_frame:
+            img.draw_rectangle(tracked_object, color=(255, 0, 0))  # Red rectangle
+            center_x = tracked_object[0] + tracked_object[2] // 2
+            center_y = tracked_object[1] + tracked_object[3] // 2
+            img.draw_cross(center_x, center_y, color=(255, 0, 0))  # Red cross
+
+        # Report the time since the previous target was lost
+        reacquisition_timer.found(current_time, slewed)
+        slew_cell = None
+
+        # Move the camera towards the target
+        servo_controller.track(tracked_object)
+    elif slew_cell is not None:
         # ====================================================================
-        # ERROR CALCULATION AND MOVEMENT DECISION
+        # TARGET LOST - SLEW TO MOST RECENTLY ACTIVE CELL
         # ====================================================================
-        # Calculate tracking errors (distance from image center)
-        x_error = CENTER_X - center_x  # Horizontal error
-        y_error = CENTER_Y - center_y  # Vertical error
-
-        # Determine if movement is needed
-        should_move = abs(x_error) > SMALL_ERROR or abs(y_error) > SMALL_ERROR
-
-        if should_move:
-            motor_moving = True
-            force_stop_counter = 0
-
-            try:
-                # ============================================================
-                # HORIZONTAL SERVO CONTROL
-                # ============================================================
-                h_pulse = STOP_PULSE
-                if abs(x_error) > SMALL_ERROR:
-                    if x_error > 0:  # Target is to the left, move camera right
-                        h_pulse = FORWARD_PULSE if abs(x_error) > LARGE_ERROR else SLOW_FORWARD
-                    else:  # Target is to the right, move camera left
-                        h_pulse = REVERSE_PULSE if abs(x_error) > LARGE_ERROR else SLOW_REVERSE
-
-                # Only send command if pulse value changed
-                if h_pulse != last_h_pulse:
-                    last_h_pulse = h_pulse
-                    set_servo_pulse(H_CHANNEL, h_pulse)
-                    time.sleep_ms(20)
-
-                # ============================================================
-                # VERTICAL SERVO CONTROL
-                # ============================================================
-                v_pulse = STOP_PULSE
-                if abs(y_error) > SMALL_ERROR:
-                    if y_error > 0:  # Target is above, move camera up
-                        v_pulse = REVERSE_PULSE if abs(y_error) > LARGE_ERROR else SLOW_REVERSE
-                    else:  # Target is below, move camera down
-                        v_pulse = FORWARD_PULSE if abs(y_error) > LARGE_ERROR else SLOW_FORWARD
-
-                # Only send command if pulse value changed
-                if v_pulse != last_v_pulse:
-                    last_v_pulse = v_pulse
-                    set_servo_pulse(V_CHANNEL, v_pulse)
-                    time.sleep_ms(20)
-
-            except Exception as e:
-                # Handle servo control errors
-                force_stop_motors()
-        else:
-            # Target is centered, stop motors
-            if motor_moving:
-                force_stop_motors()
+        x_error, y_error = occupancy_map.slew_error(slew_cell)
+        if time.ticks_diff(current_time, slew_start) > slew_timeout:
+            slew_cell = None
+            servo_controller.force_stop()
+        elif not servo_controller.move(x_error, y_error):
+            # Cell reached, wait there for a detection
+            slew_cell = None
     else:
         # ====================================================================
         # NO TARGET DETECTED - STOP MOTORS
         # ====================================================================
-        if motor_moving or force_stop_counter < FORCE_STOP_FRAMES:
-            # Send stop commands
-            set_servo_pulse(H_CHANNEL, STOP_PULSE)
-            time.sleep_ms(10)
-            set_servo_pulse(V_CHANNEL, STOP_PULSE)
-            time.sleep_ms(10)
-
-            force_stop_counter += 1
-            if force_stop_counter >= FORCE_STOP_FRAMES:
-                motor_moving = False
-                last_h_pulse = STOP_PULSE
-                last_v_pulse = STOP_PULSE
+        # No objects detected while idle, check if motors should stop
+        if not target_tracker.last_tracked_pos:
+            time_since_detection = time.ticks_diff(current_time, target_tracker.last_detection_time)
+            if time_since_detection > IDLE_TIMEOUT_MS and servo_controller.motor_moving:
+                servo_controller.force_stop()
+
+        servo_controller.idle()
+
+    # Integrate the heading up to the pulses sent in this frame
+    occupancy_map.update_heading(time.ticks_ms(), servo_controller.h_command, servo_controller.v_command)
+
+    # Send the annotated frame if this is a preview frame
+    debug_preview.end_frame(img)
+    if RUN_MODE == "compare":
+        fps_comparison.frame_done(time.ticks_ms())
+
+    # Complete the recorded frame; a JPEG recording compresses the frame in place
+    if session_recorder:
+        session_recorder.finish_frame(img, servo_controller.h_command, servo_controller.v_command,
+                                      draw_frame)
+        if RECORD_FRAMES and session_recorder.frame_index >= RECORD_FRAMES:
+            session_recorder.close()
+            session_recorder = None
+            print("Recording complete")
 
     # ========================================================================
     # MEMORY MANAGEMENT AND LOOP DELAY
     # ========================================================================
     # Free unused memory to prevent memory leaks
     gc.collect()
-    time.sleep_ms(10)  # Small delay for system stability
\ No newline at end of file
+    time.sleep_ms(10)  # Small delay for system stability
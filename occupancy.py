@@ -0,0 +1,281 @@
+"""
+Pan/Tilt Occupancy Map for Slew-to-Next-Subject Reacquisition
+
+Description:
+When the tracked target is lost, main.py used to stop the motors and wait for
+somebody to walk into the current field of view. This module remembers where
+people were seen in world coordinates so the rig can slew straight to the most
+recently active place instead of idling.
+
+- The camera heading (pan/tilt in degrees) is estimated by integrating the
+  commanded servo velocity over time. The FS90R servos are continuous rotation
+  servos, so a pulse sets a speed, not an angle.
+- Every detection is projected from image pixels into the coarse pan/tilt grid
+  using the camera field of view, and its cell is stamped with the time.
+- After a loss, best_cell() returns the most recently active cell outside
+  the current field of view (the lost target's own stamps are in view) and
+  slew_error() expresses its direction as a pixel error for the servo
+  controller, so slewing uses the same pulse selection as tracking.
+- ReacquisitionTimer reports how long it takes to lock onto a target again.
+
+Input:
+- Commanded servo pulses (ServoController.h_command / v_command)
+- Detected bounding boxes per frame
+
+Output:
+- Estimated camera heading and occupancy grid
+- Slew direction after a target loss
+- Serial console reacquisition times
+
+Functions:
+- OccupancyMap.update_heading(): Integrate servo velocity into the heading
+- OccupancyMap.add_detections(): Project detections into the grid
+- OccupancyMap.best_cell(): Most recently active cell outside the view
+- OccupancyMap.slew_error(): Pixel-equivalent error towards a cell
+- OccupancyMap.slew_time_ms(): Estimated time to slew to a cell
+- ReacquisitionTimer.lost() / found(): Measure time to reacquire a target
+"""
+
+import time
+import controller
+
+# ============================================================================
+# OCCUPANCY MAP PARAMETERS
+# ============================================================================
+# Camera field of view at QVGA (OpenMV H7 Plus default lens)
+FOV_H_DEG = 60.0
+FOV_V_DEG = 45.0
+
+# Grid resolution: pan wraps around 360 degrees, tilt is limited
+CELL_DEG = 15.0
+PAN_CELLS = 24         # 360 / CELL_DEG
+TILT_CELLS = 12        # 180 / CELL_DEG
+TILT_LIMIT_DEG = 90.0
+
+# Cells seen longer ago than this are ignored
+MEMORY_MS = 5000
+
+# Servo speed in degrees per second for each commanded pulse. These are
+# approximate values for the FS90R at the pulses in controller.py; re-measure
+# them (time one full turn at each pulse) when the rig or pulses change.
+SERVO_SPEED_DPS = {
+    controller.STOP_PULSE: 0.0,
+    controller.SLOW_FORWARD: 20.0,
+    controller.FORWARD_PULSE: 45.0,
+    controller.SLOW_REVERSE: -20.0,
+    controller.REVERSE_PULSE: -45.0,
+}
+
+# Slowest fast and slow speeds of either direction, used to estimate slew times
+FAST_DPS = min(abs(SERVO_SPEED_DPS[controller.FORWARD_PULSE]),
+               abs(SERVO_SPEED_DPS[controller.REVERSE_PULSE]))
+SLOW_DPS = min(abs(SERVO_SPEED_DPS[controller.SLOW_FORWARD]),
+               abs(SERVO_SPEED_DPS[controller.SLOW_REVERSE]))
+
+# Heading change per positive servo speed, in image coordinates. A target on
+# the left (positive x_error) is followed with a forward pulse, so forward
+# turns the view towards smaller x; a target above is followed with a reverse
+# pulse, so forward turns the view towards larger y.
+PAN_DIRECTION = -1.0
+TILT_DIRECTION = 1.0
+
+# ============================================================================
+# OCCUPANCY MAP
+# ============================================================================
+class OccupancyMap:
+    """
+    Coarse world-coordinate grid of recent detections
+
+    Input:
+        width (int) - Image width in pixels
+        height (int) - Image height in pixels
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.deg_per_px_x = FOV_H_DEG / width
+        self.deg_per_px_y = FOV_V_DEG / height
+
+        # Estimated camera heading in degrees, 0/0 at start-up
+        self.pan = 0.0
+        self.tilt = 0.0
+        self.h_pulse = controller.STOP_PULSE
+        self.v_pulse = controller.STOP_PULSE
+        self.last_time = None
+
+        # Per cell: time last seen (ms) or None, and where in the cell it was
+        self.last_seen = [None] * (PAN_CELLS * TILT_CELLS)
+        self.position = [None] * (PAN_CELLS * TILT_CELLS)
+
+        # Cells with a detection in the current frame
+        self.frame_cells = set()
+
+    def update_heading(self, current_time, h_pulse, v_pulse):
+        """
+        Integrate the servo velocity since the last update
+
+        Input:
+            current_time (int) - Timestamp in milliseconds (time.ticks_ms())
+            h_pulse (int) - Horizontal pulse commanded from now on
+            v_pulse (int) - Vertical pulse commanded from now on
+        Output: None
+        """
+        if self.last_time is not None:
+            dt = time.ticks_diff(current_time, self.last_time) / 1000.0
+            self.pan += PAN_DIRECTION * SERVO_SPEED_DPS.get(self.h_pulse, 0.0) * dt
+            self.tilt += TILT_DIRECTION * SERVO_SPEED_DPS.get(self.v_pulse, 0.0) * dt
+            self.pan = (self.pan + 180.0) % 360.0 - 180.0
+            self.tilt = max(-TILT_LIMIT_DEG, min(TILT_LIMIT_DEG, self.tilt))
+
+        self.last_time = current_time
+        self.h_pulse = h_pulse
+        self.v_pulse = v_pulse
+
+    def cell_index(self, pan, tilt):
+        """
+        Input: pan, tilt (float) - World direction in degrees
+        Output: int - Grid cell index
+        """
+        col = int((pan % 360.0) / CELL_DEG) % PAN_CELLS
+        row = int((tilt + TILT_LIMIT_DEG) / CELL_DEG)
+        row = max(0, min(TILT_CELLS - 1, row))
+        return row * PAN_CELLS + col
+
+    def cell_center(self, index):
+        """
+        Input: index (int) - Grid cell index
+        Output: tuple - (pan, tilt) of the cell centre in degrees
+        """
+        row = index // PAN_CELLS
+        col = index % PAN_CELLS
+        pan = (col + 0.5) * CELL_DEG
+        if pan >= 180.0:
+            pan -= 360.0
+        return (pan, (row + 0.5) * CELL_DEG - TILT_LIMIT_DEG)
+
+    def add_detections(self, objects, current_time):
+        """
+        Project detections into the grid at the current heading
+
+        Input:
+            objects (list) - Detected bounding boxes (x, y, width, height)
+            current_time (int) - Timestamp in milliseconds
+        Output: None
+        """
+        self.frame_cells = set()
+        for obj in objects:
+            dx = obj[0] + obj[2] // 2 - self.width // 2
+            dy = obj[1] + obj[3] // 2 - self.height // 2
+            pan = self.pan + dx * self.deg_per_px_x
+            tilt = self.tilt + dy * self.deg_per_px_y
+            index = self.cell_index(pan, tilt)
+            self.last_seen[index] = current_time
+            self.position[index] = (pan, tilt)
+            self.frame_cells.add(index)
+
+    def in_view(self, index):
+        """
+        Input: index (int) - Grid cell index
+        Output: Boolean - True if the cell's last detection is inside the
+                          current field of view
+        """
+        pan, tilt = self.position[index] or self.cell_center(index)
+        d_pan = (pan - self.pan + 180.0) % 360.0 - 180.0
+        return abs(d_pan) <= FOV_H_DEG / 2 and abs(tilt - self.tilt) <= FOV_V_DEG / 2
+
+    def best_cell(self, current_time):
+        """
+        Find the most recently active cell the camera is not looking at
+
+        Cells inside the current field of view without a detection in the
+        current frame are skipped: whoever was seen there has left, usually the
+        lost target itself.
+
+        Input: current_time (int) - Timestamp in milliseconds
+        Output: int or None - Cell index, None if nobody was seen recently
+        """
+        best_index = None
+        best_age = MEMORY_MS
+        for index in range(len(self.last_seen)):
+            seen = self.last_seen[index]
+            if seen is None:
+                continue
+            if index not in self.frame_cells and self.in_view(index):
+                continue
+            age = time.ticks_diff(current_time, seen)
+            if age <= best_age:
+                best_age = age
+                best_index = index
+        return best_index
+
+    def slew_error(self, index):
+        """
+        Express the direction of the last detection in a cell as a tracking
+        error in pixels
+
+        Input: index (int) - Grid cell index
+        Output: tuple - (x_error, y_error) for ServoController.move()
+        """
+        pan, tilt = self.position[index] or self.cell_center(index)
+        d_pan = (pan - self.pan + 180.0) % 360.0 - 180.0
+        d_tilt = tilt - self.tilt
+
+        # Same sign convention as kernels.calculate_error(): centre minus target
+        x_error = -int(d_pan / self.deg_per_px_x)
+        y_error = -int(d_tilt / self.deg_per_px_y)
+        return (x_error, y_error)
+
+    def slew_time_ms(self, index, large_error):
+        """
+        Estimate how long a slew to a cell takes: both axes move at once, with
+        the fast pulse until the error is within large_error, then the slow one
+
+        Input:
+            index (int) - Grid cell index
+            large_error (int) - Pixel error below which the slow pulse is used
+        Output: int - Estimated slew time in milliseconds
+        """
+        x_error, y_error = self.slew_error(index)
+        longest = 0.0
+        for error, deg_per_px in ((x_error, self.deg_per_px_x), (y_error, self.deg_per_px_y)):
+            distance = abs(error) * deg_per_px
+            slow = min(distance, large_error * deg_per_px)
+            longest = max(longest, (distance - slow) / FAST_DPS + slow / SLOW_DPS)
+        return int(longest * 1000)
+
+# ============================================================================
+# REACQUISITION TIMING
+# ============================================================================
+class ReacquisitionTimer:
+    """
+    Measures the time from losing a target to locking onto the next one
+    """
+
+    def __init__(self):
+        self.lost_time = None
+        self.count = 0
+        self.total_ms = 0
+
+    def lost(self, current_time):
+        """
+        Input: current_time (int) - Timestamp of the target loss in milliseconds
+        Output: None
+        """
+        self.lost_time = current_time
+
+    def found(self, current_time, slewed):
+        """
+        Input:
+            current_time (int) - Timestamp of the new lock in milliseconds
+            slewed (bool) - True if the rig slewed to a remembered cell
+        Output: None (prints the reacquisition time and running average)
+        """
+        if self.lost_time is None:
+            return
+        elapsed = time.ticks_diff(current_time, self.lost_time)
+        self.lost_time = None
+        self.count += 1
+        self.total_ms += elapsed
+        print("Reacquired in %d ms (%s), average %d ms over %d" %
+              (elapsed, "slew" if slewed else "wait", self.total_ms // self.count, self.count))
@@ -0,0 +1,172 @@
+"""
+Headless Run Mode and Decimated Debug Preview for the Upper Body Tracking System
+
+Description:
+In production nobody watches the OpenMV IDE, but drawing annotations and
+JPEG-compressing every frame for the IDE frame buffer still costs frame rate.
+This module selects how much of that work is done:
+
+- "ide": Current behaviour, every frame is annotated and streamed to the IDE
+- "headless": No drawing and no frame buffer transfer at all
+- "preview": Headless, except that every PREVIEW_INTERVAL frames, or when a
+  preview is requested, the frame is annotated and sent to the IDE as a
+  JPEG-compressed image
+
+FpsComparison cycles through the three modes and prints their frame rates side
+by side.
+
+Input:
+- Camera frames after annotation
+- Optional request pin (active low) for an immediate preview
+
+Output:
+- JPEG-compressed annotated frames in the IDE frame buffer (ide/preview modes)
+- Serial console FPS comparison table
+
+Functions:
+- DebugPreview.set_mode(): Switch run mode and enable/disable the frame buffer
+- DebugPreview.begin_frame(): Decide whether the current frame is annotated
+- DebugPreview.end_frame(): Send the annotated frame if it is a preview frame
+- FpsComparison.frame_done(): Measure FPS per mode and print the comparison
+"""
+
+import time
+import omv
+
+# ============================================================================
+# RUN MODES
+# ============================================================================
+MODE_IDE = "ide"              # Annotate and stream every frame (current behaviour)
+MODE_HEADLESS = "headless"    # No drawing, no frame buffer transfer
+MODE_PREVIEW = "preview"      # Headless with a decimated JPEG preview
+
+# ============================================================================
+# PREVIEW PARAMETERS
+# ============================================================================
+PREVIEW_INTERVAL = 30   # Frames between preview frames (1.5s at 20 FPS)
+PREVIEW_QUALITY = 50    # JPEG quality of preview frames (0-100)
+COMPARE_FRAMES = 200    # Frames measured per mode in FpsComparison
+
+# ============================================================================
+# DEBUG PREVIEW
+# ============================================================================
+class DebugPreview:
+    """
+    Controls annotation and frame buffer transfer for the selected run mode
+
+    Input:
+        mode (str) - MODE_IDE, MODE_HEADLESS or MODE_PREVIEW
+        interval (int) - Frames between preview frames
+        quality (int) - JPEG quality of preview frames
+        request_pin (pyb.Pin) - Input pin pulled low to request a preview, optional
+    """
+
+    def __init__(self, mode=MODE_IDE, interval=PREVIEW_INTERVAL, quality=PREVIEW_QUALITY,
+                 request_pin=None):
+        self.interval = interval
+        self.quality = quality
+        self.request_pin = request_pin
+        self.frame_count = 0
+        self.requested = False
+        self.draw = True          # True if the current frame is annotated
+        self.set_mode(mode)
+
+    def set_mode(self, mode):
+        """
+        Input: mode (str) - MODE_IDE, MODE_HEADLESS or MODE_PREVIEW
+        Output: None (frame buffer streaming is only enabled in ide mode)
+        """
+        self.mode = mode
+        self.frame_count = 0
+        omv.disable_fb(mode != MODE_IDE)
+
+    def begin_frame(self):
+        """
+        Decide whether the current frame is annotated
+
+        Input: None
+        Output: Boolean - True if the frame should be drawn on
+        """
+        if self.mode == MODE_IDE:
+            self.draw = True
+        elif self.mode == MODE_HEADLESS:
+            self.draw = False
+        else:
+            self.frame_count += 1
+            if self.request_pin is not None and not self.request_pin.value():
+                self.requested = True
+            self.draw = self.requested or self.frame_count >= self.interval
+        return self.draw
+
+    def end_frame(self, img):
+        """
+        Send the annotated frame to the IDE if it is a preview frame
+
+        Input: img (image.Image) - Annotated camera frame
+        Output: None
+        """
+        if self.mode != MODE_PREVIEW or not self.draw:
+            return
+
+        # Compress a copy so the frame itself stays grayscale
+        jpeg = img.compressed(quality=self.quality)
+        omv.disable_fb(False)
+        jpeg.flush()
+        omv.disable_fb(True)
+
+        self.frame_count = 0
+        self.requested = False
+
+# ============================================================================
+# FPS COMPARISON
+# ============================================================================
+class FpsComparison:
+    """
+    Cycles the run modes and reports their frame rates side by side
+
+    Input:
+        preview (DebugPreview) - Preview object whose mode is switched
+        frames (int) - Frames measured per mode
+    """
+
+    MODES = (MODE_IDE, MODE_PREVIEW, MODE_HEADLESS)
+
+    def __init__(self, preview, frames=COMPARE_FRAMES):
+        self.preview = preview
+        self.frames = frames
+        self.results = {}
+        self.index = 0
+        self.frame_count = 0
+        self.start_time = None
+        preview.set_mode(self.MODES[0])
+
+    def frame_done(self, current_time):
+        """
+        Count a finished frame and switch mode after enough frames
+
+        Input: current_time (int) - Timestamp in milliseconds (time.ticks_ms())
+        Output: None (prints the comparison after every full cycle)
+        """
+        if self.start_time is None:
+            # The first frame after a mode switch only starts the measurement
+            self.start_time = current_time
+            return
+
+        self.frame_count += 1
+        if self.frame_count < self.frames:
+            return
+
+        elapsed = time.ticks_diff(current_time, self.start_time)
+        self.results[self.MODES[self.index]] = self.frame_count * 1000.0 / max(elapsed, 1)
+
+        # Next mode
+        self.index = (self.index + 1) % len(self.MODES)
+        self.frame_count = 0
+        self.start_time = None
+        self.preview.set_mode(self.MODES[self.index])
+
+        if self.index == 0:
+            report = "FPS"
+            for mode in self.MODES:
+                report += "  %s: %.1f" % (mode, self.results[mode])
+            print(report)
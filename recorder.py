@@ -0,0 +1,302 @@
+"""
+On-Device Session Recorder for the Upper Body Tracking System
+
+Description:
+This module records what the camera saw and decided to the SD card, so field
+problems can be replayed on a desktop (recordingReader.py, autoTuner.py). Each
+frame record holds the timestamp, all detections, the tracked box and the
+servo pulses sent, followed by the frame itself as raw grayscale or JPEG.
+
+To keep the cost to a few percent of the frame rate, records are assembled in
+one buffer allocated at start-up and written to the SD card in large batches,
+when the buffer is full or every FLUSH_MS. Frames are copied into the buffer
+exactly once and no frame-sized memory is allocated per frame:
+- Raw frames are copied from the frame buffer when record() is called, before
+  anything is drawn on the frame.
+- JPEG frames are compressed in place in the frame buffer by finish_frame() at
+  the end of the loop, when the frame is no longer needed. Frames that were
+  annotated for the IDE are stored without an image, so recordings never
+  contain overlays. When every frame is annotated (annotate_all) a JPEG
+  recording would hold no images at all, so that combination is refused.
+
+The buffer holds BUFFER_FRAMES frame records but never more than HEAP_SHARE of
+the free heap. When not even one frame record fits, the recorder stops with a
+MemoryError that says so. Every flush prints the recorded size, the number of
+records stored without an image and the time spent recording as a share of the
+elapsed time.
+
+File format (little-endian):
+- File header FILE_FORMAT: magic b"ARTR", version, width, height, encoding
+- Per frame RECORD_FORMAT: frame index, time (ms), detection count, tracked
+  flag, tracked box (x, y, w, h), horizontal pulse, vertical pulse, frame bytes
+- Then detection count x DETECTION_FORMAT boxes and the frame bytes
+
+Hardware Requirements:
+- OpenMV Camera with an SD card
+
+Input:
+- Camera frames, detections, tracked box and servo pulses per frame
+
+Output:
+- Recording file on the SD card (session_NNN.rec)
+
+Functions:
+- buffer_size(): Recording buffer size for a frame size and the free heap
+- SessionRecorder.record(): Append one frame record to the buffer
+- SessionRecorder.finish_frame(): Add the pulses sent and the JPEG frame
+- SessionRecorder.flush(): Write the buffer to the SD card in one batch
+- SessionRecorder.close(): Flush and close the recording
+"""
+
+import gc
+import os
+import struct
+import time
+
+# ============================================================================
+# FILE FORMAT
+# ============================================================================
+MAGIC = b"ARTR"
+VERSION = 1
+FILE_FORMAT = "<4sHHHB"            # magic, version, width, height, encoding
+RECORD_FORMAT = "<IIBBhhhhHHI"     # index, time, n_det, tracked, box, h, v, frame length
+DETECTION_FORMAT = "<hhhh"         # x, y, width, height
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+DETECTION_SIZE = struct.calcsize(DETECTION_FORMAT)
+PULSE_OFFSET = 18                  # Byte offset of the pulses inside a record header
+FRAME_SIZE_OFFSET = 22             # Byte offset of the frame length inside a record header
+
+ENCODING_RAW = 0                   # Raw 8-bit grayscale frames
+ENCODING_JPEG = 1                  # JPEG-compressed frames
+
+# ============================================================================
+# RECORDER PARAMETERS
+# ============================================================================
+BUFFER_FRAMES = 4          # Frame records held by the buffer between writes
+HEAP_SHARE = 0.5           # Largest share of the free heap the buffer may take
+JPEG_RATIO = 4             # Expected raw/JPEG size ratio at JPEG_QUALITY
+FLUSH_MS = 2000            # Longest time data stays in the buffer
+JPEG_QUALITY = 70          # Quality of JPEG-compressed frames
+MAX_DETECTIONS = 16        # Detections stored per frame
+FILE_PATTERN = "session_%03d.rec"
+
+# ============================================================================
+# BUFFER SIZING
+# ============================================================================
+def buffer_size(width, height, encoding, mem_free):
+    """
+    Size the recording buffer for the frame size and the free heap
+
+    Input:
+        width (int), height (int) - Frame size in pixels
+        encoding (int) - ENCODING_RAW or ENCODING_JPEG
+        mem_free (int) - Free heap in bytes (gc.mem_free())
+    Output: tuple - (buffer size, bytes needed for one frame record)
+    """
+    frame_bytes = width * height
+    if encoding == ENCODING_JPEG:
+        frame_bytes //= JPEG_RATIO
+    needed = RECORD_SIZE + MAX_DETECTIONS * DETECTION_SIZE + frame_bytes
+    return min(needed * BUFFER_FRAMES, int(mem_free * HEAP_SHARE)), needed
+
+# ============================================================================
+# SESSION RECORDER
+# ============================================================================
+class SessionRecorder:
+    """
+    Buffered recorder of frames and tracking decisions
+
+    Input:
+        width (int) - Frame width in pixels
+        height (int) - Frame height in pixels
+        encoding (int) - ENCODING_RAW or ENCODING_JPEG
+        frame_every (int) - Store the image of every Nth frame, decisions always
+        directory (str) - Directory for the recording on the SD card
+        size (int) - Buffer size in bytes, None to size it with buffer_size()
+        annotate_all (bool) - True if every frame is drawn on (IDE run mode)
+    """
+
+    def __init__(self, width, height, encoding=ENCODING_JPEG, frame_every=1, directory="/",
+                 size=None, annotate_all=False):
+        if encoding == ENCODING_JPEG and annotate_all:
+            raise ValueError("JPEG recording stores no image for annotated frames and every "
+                             "frame is annotated; use ENCODING_RAW or a headless/preview run mode")
+        self.encoding = encoding
+        self.frame_every = frame_every
+
+        # One buffer for the whole recording, allocated before the heap fragments
+        gc.collect()
+        mem_free = gc.mem_free()
+        automatic, needed = buffer_size(width, height, encoding, mem_free)
+        if size is None:
+            size = automatic
+        if size < needed:
+            raise MemoryError("Recording needs a buffer of %d bytes for %dx%d %s frames, "
+                              "only %d bytes available (%d bytes free heap); use ENCODING_JPEG "
+                              "or a smaller frame size" %
+                              (needed, width, height,
+                               "jpeg" if encoding == ENCODING_JPEG else "raw", size, mem_free))
+        try:
+            self.buffer = bytearray(size)
+        except MemoryError:
+            raise MemoryError("Cannot allocate the %d byte recording buffer (%d bytes free heap); "
+                              "set a smaller RECORD_BUFFER_SIZE" % (size, mem_free))
+        self.view = memoryview(self.buffer)
+        self.used = 0
+        self.header_pos = -1          # Buffer offset of the last record header
+        self.pending_jpeg = False     # Last record waits for its JPEG frame
+        self.has_image = False        # Last record holds an image
+
+        # Statistics for overhead reporting
+        self.frame_index = 0
+        self.without_image = 0        # Records stored without an image
+        self.bytes_written = 0
+        self.busy_us = 0
+        self.start_time = time.ticks_ms()
+        self.last_flush = self.start_time
+
+        # First unused session file name
+        existing = os.listdir(directory)
+        number = 0
+        while FILE_PATTERN % number in existing:
+            number += 1
+        self.path = directory.rstrip("/") + "/" + FILE_PATTERN % number
+        self.file = open(self.path, "wb")
+        self.file.write(struct.pack(FILE_FORMAT, MAGIC, VERSION, width, height, encoding))
+        print("Recording to", self.path, "with a", size, "byte buffer")
+
+    def record(self, img, current_time, objects, tracked_object):
+        """
+        Append one frame record; call before anything is drawn on the frame
+
+        Input:
+            img (image.Image) - Current camera frame
+            current_time (int) - Frame timestamp in milliseconds
+            objects (list) - Detected bounding boxes
+            tracked_object (tuple) - Tracked box, or None
+        Output: None
+        """
+        start = time.ticks_us()
+
+        # Raw frames are copied now; JPEG frames are added by finish_frame()
+        store_frame = self.frame_index % self.frame_every == 0
+        frame = None
+        if store_frame and self.encoding == ENCODING_RAW:
+            frame = img.bytearray()
+        self.pending_jpeg = store_frame and self.encoding == ENCODING_JPEG
+        frame_size = len(frame) if frame is not None else 0
+
+        detections = objects[:MAX_DETECTIONS]
+        size = RECORD_SIZE + len(detections) * DETECTION_SIZE
+        if size + frame_size > len(self.buffer):
+            # Frame larger than the whole buffer: store the decisions only
+            frame_size = 0
+        size += frame_size
+        self.has_image = frame_size > 0
+
+        # Write out the batch when this record does not fit or it is getting old
+        if size > len(self.buffer) - self.used or \
+                time.ticks_diff(current_time, self.last_flush) > FLUSH_MS:
+            self.flush()
+
+        # Record header; pulses are filled in by finish_frame()
+        box = tracked_object if tracked_object else (0, 0, 0, 0)
+        self.header_pos = self.used
+        struct.pack_into(RECORD_FORMAT, self.buffer, self.used,
+                         self.frame_index, current_time & 0xFFFFFFFF, len(detections),
+                         1 if tracked_object else 0, box[0], box[1], box[2], box[3],
+                         0, 0, frame_size)
+        self.used += RECORD_SIZE
+
+        for obj in detections:
+            struct.pack_into(DETECTION_FORMAT, self.buffer, self.used, obj[0], obj[1], obj[2], obj[3])
+            self.used += DETECTION_SIZE
+
+        if frame_size:
+            self.view[self.used:self.used + frame_size] = frame
+            self.used += frame_size
+
+        self.frame_index += 1
+        self.busy_us += time.ticks_diff(time.ticks_us(), start)
+
+    def finish_frame(self, img, h_pulse, v_pulse, annotated):
+        """
+        Complete the last record; call when the frame is no longer needed
+
+        Input:
+            img (image.Image) - Camera frame, JPEG-compressed in place
+            h_pulse (int) - Horizontal pulse on the wire
+            v_pulse (int) - Vertical pulse on the wire
+            annotated (bool) - True if the frame was drawn on
+        Output: None
+        """
+        if self.header_pos < 0:
+            return
+        start = time.ticks_us()
+        struct.pack_into("<HH", self.buffer, self.header_pos + PULSE_OFFSET, h_pulse, v_pulse)
+
+        if self.pending_jpeg and not annotated:
+            # Compress in the frame buffer, then copy once into the batch
+            img.compress(quality=JPEG_QUALITY)
+            frame = img.bytearray()
+            frame_size = len(frame)
+            if frame_size > len(self.buffer) - self.used:
+                self.flush_previous()
+            if frame_size <= len(self.buffer) - self.used:
+                self.view[self.used:self.used + frame_size] = frame
+                self.used += frame_size
+                struct.pack_into("<I", self.buffer, self.header_pos + FRAME_SIZE_OFFSET, frame_size)
+                self.has_image = True
+        self.pending_jpeg = False
+
+        # Skipped by frame_every, annotated, or too large for the buffer
+        if not self.has_image:
+            self.without_image += 1
+        self.busy_us += time.ticks_diff(time.ticks_us(), start)
+
+    def flush_previous(self):
+        """
+        Write the records before the last one and move it to the buffer start
+
+        Input: None
+        Output: None
+        """
+        length = self.used - self.header_pos
+        if self.header_pos < length:
+            return  # Nothing worth writing; the areas would overlap
+        self.file.write(self.view[:self.header_pos])
+        self.bytes_written += self.header_pos
+        self.view[:length] = self.view[self.header_pos:self.used]
+        self.header_pos = 0
+        self.used = length
+
+    def flush(self):
+        """
+        Write the buffered records to the SD card in one batch
+
+        Input: None
+        Output: None (prints the recording size and overhead)
+        """
+        start = time.ticks_us()
+        if self.used:
+            self.file.write(self.view[:self.used])
+            self.file.flush()
+            self.bytes_written += self.used
+            self.used = 0
+        self.header_pos = -1
+        now = time.ticks_ms()
+        self.last_flush = now
+        self.busy_us += time.ticks_diff(time.ticks_us(), start)
+
+        elapsed_ms = max(1, time.ticks_diff(now, self.start_time))
+        print("Recorded %d frames (%d without image), %d KB, overhead %.1f%%" %
+              (self.frame_index, self.without_image, self.bytes_written // 1024,
+               self.busy_us / (elapsed_ms * 10.0)))
+
+    def close(self):
+        """
+        Input: None
+        Output: None (flushes and closes the recording file)
+        """
+        self.flush()
+        self.file.close()
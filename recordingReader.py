@@ -0,0 +1,213 @@
+"""
+Session Recording Reader for the Upper Body Tracking System
+
+Description:
+This host tool reads the session recordings written by recorder.py on the
+camera's SD card. Records are read one at a time with a generator, so a
+recording of any length can be iterated without loading it into memory, and
+frame data is only read when it is asked for. A recording cut short by a power
+loss ends at its last complete record.
+
+Recordings can be summarised on the console or exported as a session directory
+(frames plus recorded.csv) that autoTuner.py and hostDetector.py accept.
+
+Host Requirements:
+- Python 3 (no other packages needed)
+
+Input:
+- Recording files (session_NNN.rec) copied from the SD card
+
+Output:
+- Recording summary on the console
+- Optional session directory: frame_NNNNN.pgm (raw) or .jpg (JPEG) files,
+  recorded.csv with the detections, tracked box and pulses of every frame,
+  and optionally labels.csv with the tracked boxes
+
+Functions:
+- Recording: Open a recording and read its file header
+- Recording.records(): Iterate the frame records lazily
+- export_session(): Write a recording as a session directory
+- main(): Command line entry point
+
+Usage:
+    python recordingReader.py session_000.rec
+    python recordingReader.py --export sessions/walk1 session_000.rec
+"""
+
+import argparse
+import collections
+import os
+import struct
+
+import recorder
+
+# ============================================================================
+# FRAME RECORD
+# ============================================================================
+# One recorded frame; frame is None when it was not stored or not loaded
+FrameRecord = collections.namedtuple(
+    "FrameRecord", ("index", "time_ms", "detections", "tracked", "h_pulse", "v_pulse", "frame"))
+
+# ============================================================================
+# RECORDING
+# ============================================================================
+class Recording:
+    """
+    Recording file written by recorder.SessionRecorder
+
+    Input:
+        path (str) - Path of the recording file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        header_size = struct.calcsize(recorder.FILE_FORMAT)
+        with open(path, "rb") as f:
+            header = f.read(header_size)
+        if len(header) < header_size:
+            raise ValueError("%s: not a session recording" % path)
+        magic, version, self.width, self.height, self.encoding = \
+            struct.unpack(recorder.FILE_FORMAT, header)
+        if magic != recorder.MAGIC:
+            raise ValueError("%s: not a session recording" % path)
+        if version != recorder.VERSION:
+            raise ValueError("%s: unsupported recording version %d" % (path, version))
+        self.data_offset = header_size
+
+    def records(self, load_frames=True):
+        """
+        Iterate the frame records in file order
+
+        Input: load_frames (bool) - Read the frame bytes; False skips them
+        Output: generator of FrameRecord
+        """
+        with open(self.path, "rb") as f:
+            f.seek(self.data_offset)
+            while True:
+                header = f.read(recorder.RECORD_SIZE)
+                if len(header) < recorder.RECORD_SIZE:
+                    return
+                (index, time_ms, detection_count, tracked_flag, x, y, w, h,
+                 h_pulse, v_pulse, frame_size) = struct.unpack(recorder.RECORD_FORMAT, header)
+
+                detection_bytes = f.read(detection_count * recorder.DETECTION_SIZE)
+                if len(detection_bytes) < detection_count * recorder.DETECTION_SIZE:
+                    return
+                detections = [struct.unpack_from(recorder.DETECTION_FORMAT, detection_bytes,
+                                                 i * recorder.DETECTION_SIZE)
+                              for i in range(detection_count)]
+
+                frame = None
+                if frame_size and load_frames:
+                    frame = f.read(frame_size)
+                    if len(frame) < frame_size:
+                        return
+                elif frame_size:
+                    # Skip the frame, but stop at a truncated last record
+                    position = f.tell() + frame_size
+                    if position > os.fstat(f.fileno()).st_size:
+                        return
+                    f.seek(position)
+
+                tracked = (x, y, w, h) if tracked_flag else None
+                yield FrameRecord(index, time_ms, detections, tracked, h_pulse, v_pulse, frame)
+
+    def __iter__(self):
+        return self.records()
+
+# ============================================================================
+# SESSION EXPORT
+# ============================================================================
+def export_session(recording, directory, write_labels=False):
+    """
+    Write a recording as a session directory for autoTuner.py
+
+    Input:
+        recording (Recording) - Recording to export
+        directory (str) - Output session directory
+        write_labels (bool) - Also write the tracked boxes as labels.csv
+    Output: int - Number of frames written
+    """
+    os.makedirs(directory, exist_ok=True)
+    extension = ".jpg" if recording.encoding == recorder.ENCODING_JPEG else ".pgm"
+    pgm_header = ("P5\n%d %d\n255\n" % (recording.width, recording.height)).encode()
+
+    frame_count = 0
+    labels = []
+    with open(os.path.join(directory, "recorded.csv"), "w") as log:
+        log.write("frame,index,time_ms,h_pulse,v_pulse,tracked,detections\n")
+        for record in recording.records():
+            if record.frame is None:
+                # Decisions without an image cannot be replayed
+                continue
+
+            name = "frame_%05d%s" % (frame_count, extension)
+            with open(os.path.join(directory, name), "wb") as f:
+                if extension == ".pgm":
+                    f.write(pgm_header)
+                f.write(record.frame)
+
+            # Boxes as "x y w h", several detections separated by ";"
+            tracked = " ".join(str(v) for v in record.tracked) if record.tracked else ""
+            detections = ";".join(" ".join(str(v) for v in box) for box in record.detections)
+            log.write("%d,%d,%d,%d,%d,%s,%s\n" % (frame_count, record.index, record.time_ms,
+                                                   record.h_pulse, record.v_pulse,
+                                                   tracked, detections))
+            if record.tracked:
+                labels.append((frame_count,) + record.tracked)
+            frame_count += 1
+
+    if write_labels:
+        with open(os.path.join(directory, "labels.csv"), "w") as f:
+            f.write("frame,x,y,w,h\n")
+            for row in labels:
+                f.write("%d,%d,%d,%d,%d\n" % row)
+
+    return frame_count
+
+# ============================================================================
+# MAIN
+# ============================================================================
+def main():
+    """
+    Input: Command line arguments (see --help)
+    Output: None (prints a summary per recording, optionally exports it)
+    """
+    parser = argparse.ArgumentParser(description="Read session recordings from the camera")
+    parser.add_argument("recordings", nargs="+", help="Recording files (session_NNN.rec)")
+    parser.add_argument("--export", default=None,
+                        help="Export as session directory (one subdirectory per file if several)")
+    parser.add_argument("--labels", action="store_true",
+                        help="Write the tracked boxes as labels.csv when exporting")
+    args = parser.parse_args()
+
+    for path in args.recordings:
+        recording = Recording(path)
+
+        # Summary pass without reading the frames
+        frames = tracked = detections = 0
+        first_time = last_time = None
+        for record in recording.records(load_frames=False):
+            if first_time is None:
+                first_time = record.time_ms
+            last_time = record.time_ms
+            frames += 1
+            tracked += record.tracked is not None
+            detections += len(record.detections)
+
+        duration = ((last_time - first_time) & 0xFFFFFFFF) / 1000.0 if frames else 0.0
+        print("%s: %dx%d %s, %d frames in %.1f s (%.1f FPS), tracked %.0f%%, %.2f detections/frame" %
+              (path, recording.width, recording.height,
+               "jpeg" if recording.encoding == recorder.ENCODING_JPEG else "raw",
+               frames, duration, (frames - 1) / duration if duration > 0 else 0.0,
+               100.0 * tracked / max(frames, 1), detections / max(frames, 1)))
+
+        if args.export:
+            directory = args.export
+            if len(args.recordings) > 1:
+                directory = os.path.join(directory, os.path.splitext(os.path.basename(path))[0])
+            images = export_session(recording, directory, args.labels)
+            print("  exported %d frames to %s" % (images, directory))
+
+if __name__ == "__main__":
+    main()
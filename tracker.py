@@ -0,0 +1,112 @@
+"""
+Target Tracker for the Upper Body Tracking System
+
+Description:
+This module keeps a single target locked across frames. While a target is being
+tracked, the detection with the highest IoU against its last position is taken
+as the same person. If no detection matches for more than max_lost_frames, the
+target is dropped and the largest detection becomes the new target. The tracked
+box is smoothed to reduce jitter.
+
+The tracker only uses the fixed-point kernels and does not touch the camera or
+the servos, so it runs unchanged under CPython for replaying recorded sessions.
+
+Input:
+- Detected bounding boxes per frame
+- Frame timestamps in milliseconds
+
+Output:
+- Smoothed tracked bounding box, or None when nothing is tracked
+
+Functions:
+- Tracker.update(): Match detections to the current target for one frame
+"""
+
+import kernels
+
+# ============================================================================
+# TRACKING PARAMETERS
+# ============================================================================
+MAX_LOST_FRAMES = 3    # Frames to wait before considering target lost
+MIN_IOU = 0.3          # Minimum 30% overlap to keep the same target
+SMOOTHING_ALPHA = 0.7  # Smoothing factor (0.7 = 70% new, 30% old)
+
+# ============================================================================
+# TRACKER
+# ============================================================================
+class Tracker:
+    """
+    IoU-based single target tracker
+
+    Input:
+        max_lost_frames (int) - Frames without a match before the target is dropped
+        min_iou (float) - Minimum IoU to match a detection to the target
+        alpha (float) - Weight of the new position when smoothing
+    """
+
+    def __init__(self, max_lost_frames=MAX_LOST_FRAMES, min_iou=MIN_IOU, alpha=SMOOTHING_ALPHA):
+        self.max_lost_frames = max_lost_frames
+        self.min_iou = kernels.to_fixed(min_iou)
+        self.alpha = kernels.to_fixed(alpha)
+
+        # Tracking state
+        self.last_tracked_pos = None     # Last known position of tracked object
+        self.track_lost_count = 0        # Counter for consecutive frames with no detection
+        self.last_detection_time = 0     # Timestamp of last successful detection
+        self.target_lost = False         # True in the frame the target was dropped
+
+    def update(self, objects, current_time):
+        """
+        Track the target through one frame of detections
+
+        Input:
+            objects (list) - Detected bounding boxes (x, y, width, height)
+            current_time (int) - Frame timestamp in milliseconds
+        Output:
+            tuple or None - Smoothed tracked box, None if nothing is tracked
+        """
+        tracked_object = None
+        self.target_lost = False
+
+        # Case 1: Currently tracking a target
+        if self.last_tracked_pos:
+            best_match = None
+            best_score = 0
+
+            # Find best matching object using IoU
+            for obj in objects:
+                iou = kernels.calculate_iou(self.last_tracked_pos, obj)
+                if iou > best_score and iou > self.min_iou:
+                    best_score = iou
+                    best_match = obj
+
+            if best_match:
+                # Successfully matched previous target
+                tracked_object = best_match
+                self.track_lost_count = 0
+                self.last_detection_time = current_time
+            else:
+                # Target lost, increment counter
+                self.track_lost_count += 1
+
+                # Stop tracking if target lost for too many frames
+                if self.track_lost_count > self.max_lost_frames:
+                    self.last_tracked_pos = None
+                    self.target_lost = True
+
+        # Case 2: Not currently tracking a target
+        if not self.last_tracked_pos and objects:
+            # Select largest detected object as new target
+            tracked_object = max(objects, key=lambda r: r[2] * r[3])
+            self.track_lost_count = 0
+            self.last_detection_time = current_time
+
+        if tracked_object:
+            # Apply smoothing to reduce jitter
+            if self.last_tracked_pos:
+                tracked_object = kernels.smooth_box(tracked_object, self.last_tracked_pos, self.alpha)
+
+            # Update last known position
+            self.last_tracked_pos = tracked_object
+
+        return tracked_object